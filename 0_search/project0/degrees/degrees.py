@@ -1,7 +1,15 @@
+import argparse
 import csv
+import gc
+import json
+import multiprocessing
 import sys
+from array import array
+from collections import deque
 
-from util import Node, StackFrontier, QueueFrontier
+from distances import DistanceTable
+from graph import StringTable, load_graph, load_snapshot
+from util import Node, IndexedQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +20,29 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact int-indexed store, used instead of the three maps above
+# when the data is loaded with compact=True
+graph = None
 
-def load_data(directory):
+# Maps source person_ids to their DistanceTable, used by shortest_path
+# to answer queries from (or to) that person without searching
+distance_tables = {}
+
+
+def load_data(directory, compact=False):
     """
     Load data from CSV files into memory.
+
+    If directory has an up-to-date snapshot (see graph.py), it is
+    memory-mapped into a CompactGraph instead of parsing the CSV
+    files and filling the names/people/movies dicts.
+    With compact=True, the snapshot is compiled first if needed.
     """
+    global graph
+    graph = load_graph(directory) if compact else load_snapshot(directory)
+    if graph is not None:
+        return
+
     # Load people
     # association id/name/birthyear
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
@@ -54,14 +80,64 @@ def load_data(directory):
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Degrees of separation.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="use the compact int-indexed graph store")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--batch", metavar="QUERIES",
+                        help="CSV file of (source, target) names or ids "
+                             "to answer as JSON lines, instead of asking")
+    parser.add_argument("--distances", metavar="PERSON",
+                        help="write the distance table from a person "
+                             "(name or id) to --output and exit")
+    parser.add_argument("--load-distances", metavar="FILE", action="append",
+                        default=[], help="distance table to answer from")
+    parser.add_argument("--output", default="-",
+                        help="JSON lines output of --batch (default: stdout), "
+                             "or distance table file of --distances "
+                             "(default: directory/person_id.distances)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for --batch (default: all cores)")
+    args = parser.parse_args()
+
+    # Keep stdout for the JSON lines in batch mode
+    log = sys.stderr if args.batch else sys.stdout
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=log)
+    load_data(args.directory, compact=args.compact)
+    print("Data loaded.", file=log)
+    for filename in args.load_distances:
+        load_distance_table(filename)
+
+    if args.distances:
+        source = resolve_person(args.distances)
+        if source is None:
+            sys.exit("Person not found.")
+        table = distance_table(source)
+        filename = args.output
+        if filename == "-":
+            filename = f"{args.directory}/{source}.distances"
+        table.save(filename)
+        reachable = [d for d in table.distance if d >= 0]
+        print(f"{len(reachable)} people connected, "
+              f"up to {max(reachable)} degrees of separation.")
+        print(f"Distance table written to {filename}")
+        return
+
+    if args.batch:
+        queries = read_queries(args.batch)
+        output = sys.stdout if args.output == "-" else open(args.output, "w")
+        try:
+            for record in batch_queries(queries, workers=args.workers,
+                                        bidirectional=args.bidirectional):
+                output.write(json.dumps(record) + "\n")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -70,7 +146,10 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    stats = {}
+    path = shortest_path(source, target,
+                         bidirectional=args.bidirectional, stats=stats)
+    print("States Explored:", stats["num_explored"])
 
     if path is None:
         print("Not connected.")
@@ -79,18 +158,22 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_for_id(path[i][1])["name"]
+            person2 = person_for_id(path[i + 1][1])["name"]
+            movie = movie_for_id(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    With bidirectional=True, the search expands from both ends
+    (see bidirectional_search). If a stats dict is given, the
+    number of expanded people is stored in stats["num_explored"].
     
     
     Complete the implementation of the shortest_path function 
@@ -120,15 +203,43 @@ def shortest_path(source, target):
         
     
     """
-    # read inputs
-    source_id = source
-    target_id = target
+    # Read the path from a distance table when there is one
+    if source in distance_tables or target in distance_tables:
+        if stats is not None:
+            stats["num_explored"] = 0
+        if source in distance_tables:
+            return distance_tables[source].path_to(target)
+        path = distance_tables[target].path_to(source)
+        return None if path is None else reverse_path(target, path)
+
+    search = bidirectional_search if bidirectional else breadth_first_search
+    if graph is not None:
+        # Search on the compact store with int states, and only
+        # convert the ids back for the returned path
+        path = search(graph.person_index(source),
+                      graph.person_index(target),
+                      graph.neighbors, stats)
+        if path is None:
+            return None
+        return [(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in path]
+    return search(source, target, neighbors_for_person, stats)
+
+
+def breadth_first_search(source_id, target_id, neighbors, stats=None):
+    """
+    Returns the shortest list of (action, state) pairs from
+    source_id to target_id, where neighbors(state) gives the
+    (action, state) pairs reachable from a state.
+
+    If no possible path, returns None.
+    """
     # Initialize source node
     source_node = Node(state=source_id,
                        parent=None,
                        action=None)
     # Initialize Frontier with source node
-    frontier = QueueFrontier()
+    frontier = IndexedQueueFrontier()
     frontier.add(source_node)
     
     # Initialize explored set
@@ -140,6 +251,8 @@ def shortest_path(source, target):
         
         # If nothing left in frontier, then no path
         if frontier.empty():
+            if stats is not None:
+                stats["num_explored"] = num_explored
             return None
             
         # Choose a node from the frontier
@@ -148,6 +261,8 @@ def shortest_path(source, target):
         
         # If node is the goal, then we have a solution
         if node.state == target_id:
+            if stats is not None:
+                stats["num_explored"] = num_explored
             # looping back from target to source
             actions = []
             cells = []    
@@ -170,7 +285,7 @@ def shortest_path(source, target):
         explored_nodes.add(node.state)
         # ... and add neighbors to frontier
         # get action and state of current node
-        for action, state in neighbors_for_person(node.state):
+        for action, state in neighbors(node.state):
             # if state not already in frontier and not already explored
             if not frontier.contains_state(state) and state not in explored_nodes:
                 # create note for that state
@@ -182,20 +297,317 @@ def shortest_path(source, target):
                 # add that child to the frontier
                 frontier.add(child)
 
-        
+
+def bidirectional_search(source_id, target_id, neighbors, stats=None):
+    """
+    Same as breadth_first_search, but growing one BFS tree from
+    each end and stopping when they meet.
+
+    Each step expands a whole layer of the smaller of the two
+    frontiers, so on hub-heavy graphs the search only goes half
+    the distance deep on each side.
+    The graph must be undirected (co-starring is symmetric).
+    """
+    num_explored = 0
+    if source_id == target_id:
+        if stats is not None:
+            stats["num_explored"] = num_explored
+        return []
+
+    # Map each reached state to (action, previous state, depth), where
+    # previous state is towards the source (forward) or target (backward)
+    forward = {source_id: (None, None, 0)}
+    backward = {target_id: (None, None, 0)}
+    forward_frontier = [source_id]
+    backward_frontier = [target_id]
+    meeting = None
+
+    while meeting is None and forward_frontier and backward_frontier:
+        # Always grow the smaller frontier
+        is_forward = len(forward_frontier) <= len(backward_frontier)
+        if is_forward:
+            frontier, reached, other = forward_frontier, forward, backward
+        else:
+            frontier, reached, other = backward_frontier, backward, forward
+
+        # Expand the whole layer, keeping the shortest meeting point
+        best_length = None
+        next_frontier = []
+        for state in frontier:
+            num_explored += 1
+            depth = reached[state][2] + 1
+            for action, neighbor in neighbors(state):
+                if neighbor in reached:
+                    continue
+                reached[neighbor] = (action, state, depth)
+                next_frontier.append(neighbor)
+                if neighbor in other:
+                    length = depth + other[neighbor][2]
+                    if best_length is None or length < best_length:
+                        best_length = length
+                        meeting = neighbor
+
+        if is_forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    if stats is not None:
+        stats["num_explored"] = num_explored
+    if meeting is None:
+        return None
+
+    # Source -> meeting half, walking the forward tree back
+    path = []
+    state = meeting
+    while state != source_id:
+        action, previous, _ = forward[state]
+        path.append((action, state))
+        state = previous
+    path.reverse()
+    # Meeting -> target half : the action joining state to the next
+    # state towards the target is stored on state in the backward tree
+    state = meeting
+    while state != target_id:
+        action, following, _ = backward[state]
+        path.append((action, following))
+        state = following
+    return path
+
+
+def search_tree(source_id, target_ids, neighbors):
+    """
+    Grows a single BFS tree from source_id until all of target_ids
+    are reached, and returns a dict mapping each of them to its
+    shortest list of (action, state) pairs, or None if unreachable.
+    """
+    parents = {source_id: None}
+    remaining = set(target_ids)
+    remaining.discard(source_id)
+    frontier = deque([source_id])
+    while remaining and frontier:
+        state = frontier.popleft()
+        for action, neighbor in neighbors(state):
+            if neighbor not in parents:
+                parents[neighbor] = (action, state)
+                remaining.discard(neighbor)
+                frontier.append(neighbor)
+
+    paths = {}
+    for target_id in target_ids:
+        if target_id not in parents:
+            paths[target_id] = None
+            continue
+        path = []
+        state = target_id
+        while parents[state] is not None:
+            action, previous = parents[state]
+            path.append((action, state))
+            state = previous
+        path.reverse()
+        paths[target_id] = path
+    return paths
+
+
+def paths_from_source(source, targets):
+    """
+    Returns a dict mapping each person id of targets to its
+    shortest path from source, as returned by shortest_path,
+    using one BFS tree for all of them.
+    """
+    if source in distance_tables:
+        table = distance_tables[source]
+        return {target: table.path_to(target) for target in targets}
+    if graph is None:
+        return search_tree(source, targets, neighbors_for_person)
+    indices = {graph.person_index(target): target for target in targets}
+    paths = search_tree(graph.person_index(source), indices, graph.neighbors)
+    return {
+        indices[index]: None if path is None else
+        [(graph.movie_ids[movie], graph.person_ids[person])
+         for movie, person in path]
+        for index, path in paths.items()
+    }
+
+
+def reverse_path(start, path):
+    """
+    Returns the path, as returned by shortest_path, going through
+    the same people and movies as path but in the other direction,
+    where start is the first person of path.
+    """
+    people_on_path = [start] + [person_id for _, person_id in path[:-1]]
+    return [(movie_id, person_id) for (movie_id, _), person_id
+            in zip(reversed(path), reversed(people_on_path))]
+
+
+def distance_table(source):
+    """
+    Computes the DistanceTable of source with one BFS over every
+    connected person, and registers it so that later shortest_path
+    calls from or to source are read from it.
+    """
+    if graph is not None:
+        table = DistanceTable.build(graph.person_index(source),
+                                    graph.person_ids, graph.movie_ids,
+                                    graph.neighbors,
+                                    person_order=graph.person_order)
+    else:
+        # Intern the dict store ids, in sorted order
+        person_ids = sorted(people)
+        movie_ids = sorted(movies)
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        def neighbors(person):
+            return [(movie_index[movie_id], person_index[person_id])
+                    for movie_id, person_id
+                    in neighbors_for_person(person_ids[person])]
+
+        table = DistanceTable.build(person_index[source],
+                                    StringTable.from_strings(person_ids),
+                                    StringTable.from_strings(movie_ids),
+                                    neighbors,
+                                    person_order=array("i", range(len(person_ids))))
+    distance_tables[source] = table
+    return table
+
+
+def load_distance_table(filename):
+    """
+    Loads a distance table saved with DistanceTable.save and
+    registers it like distance_table does.
+    """
+    table = DistanceTable.load(filename)
+    distance_tables[table.source_id] = table
+    return table
+
+
+def read_queries(filename):
+    """
+    Returns the list of (source, target) pairs of a CSV file, where
+    each person is given by id or by name. Blank lines and lines
+    starting with # are ignored.
+    """
+    queries = []
+    with open(filename, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            if len(row) != 2:
+                raise ValueError(f"expected source,target, got {row}")
+            queries.append((row[0].strip(), row[1].strip()))
+    return queries
+
+
+def resolve_person(query):
+    """
+    Returns the person id for a query that is either a person id
+    or an unambiguous name, else None.
+    """
+    if graph is not None:
+        if graph.person_index(query) is not None:
+            return query
+    elif query in people:
+        return query
+    person_ids = person_ids_for_name(query)
+    return person_ids[0] if len(person_ids) == 1 else None
+
+
+def solve_query_group(task):
+    """
+    Returns the JSON records of a group of queries sharing a source.
+    Runs in the batch worker processes.
+    """
+    source, queries, bidirectional = task
+    targets = {target for _, _, target in queries}
+    if len(targets) == 1:
+        target, = targets
+        paths = {target: shortest_path(source, target,
+                                       bidirectional=bidirectional)}
+    else:
+        paths = paths_from_source(source, targets)
+
+    records = []
+    for source_query, target_query, target in queries:
+        path = paths[target]
+        records.append({
+            "source": source_query,
+            "target": target_query,
+            "degrees": None if path is None else len(path),
+            "path": None if path is None else [list(step) for step in path],
+        })
+    return records
+
+
+def batch_queries(queries, workers=None, bidirectional=False):
+    """
+    Yields one JSON-ready record per (source, target) query, as
+    soon as its group is solved, so not in the input order.
+
+    Queries sharing a source are answered from one BFS tree, and
+    the groups are spread over a pool of `workers` processes.
+    The pool is forked after loading, so the workers share the
+    loaded data copy-on-write instead of loading it again.
+    """
+    groups = {}
+    for source_query, target_query in queries:
+        source = resolve_person(source_query)
+        target = resolve_person(target_query)
+        if source is None or target is None:
+            missing = source_query if source is None else target_query
+            yield {"source": source_query, "target": target_query,
+                   "error": f"unknown or ambiguous person: {missing}"}
+            continue
+        groups.setdefault(source, []).append(
+            (source_query, target_query, target))
+    tasks = [(source, group, bidirectional)
+             for source, group in groups.items()]
+
+    if (workers == 1 or len(tasks) <= 1
+            or "fork" not in multiprocessing.get_all_start_methods()):
+        for task in tasks:
+            yield from solve_query_group(task)
+        return
+
+    # Move the loaded data out of the garbage collector's reach, so
+    # that collections in the workers do not copy its pages
+    # (and back in reach afterwards, or whenever the caller stops)
+    gc.freeze()
+    try:
+        workers = workers or multiprocessing.cpu_count()
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers) as pool:
+            chunksize = max(1, len(tasks) // (4 * workers))
+            for records in pool.imap_unordered(solve_query_group, tasks,
+                                               chunksize=chunksize):
+                yield from records
+    finally:
+        gc.unfreeze()
+
+
+def person_ids_for_name(name):
+    """
+    Returns the list of IMDB ids for a person's name.
+    """
+    if graph is not None:
+        return [graph.person_ids[person]
+                for person in graph.people_for_name(name)]
+    return list(names.get(name.lower(), set()))
+
 
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = person_ids_for_name(name)
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_for_id(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -210,11 +622,36 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_for_id(person_id):
+    """
+    Returns the dictionary of name and birth of a person id.
+    """
+    if graph is not None:
+        person = graph.person_index(person_id)
+        return {"name": graph.person_names[person],
+                "birth": graph.person_births[person]}
+    return people[person_id]
+
+
+def movie_for_id(movie_id):
+    """
+    Returns the dictionary of title and year of a movie id.
+    """
+    if graph is not None:
+        movie = graph.movie_index(movie_id)
+        return {"title": graph.movie_titles[movie],
+                "year": graph.movie_years[movie]}
+    return movies[movie_id]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in graph.neighbors(graph.person_index(person_id))}
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,139 @@
+"""
+Single-source distance tables ("Bacon numbers").
+
+A DistanceTable holds, for one source person, the degrees of
+separation of every person and the parent pointers of a BFS tree,
+in flat int arrays indexed like the person id table. Any shortest
+path from the source is then read back in O(path length).
+
+Tables are saved with the same section layout as the graph snapshot
+(see graph.py), and memory-mapped when loaded.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from collections import deque
+
+from graph import StringTable, find, read_arrays, sorted_order, write_arrays
+
+
+MAGIC = b"DEGDIST\0"
+VERSION = 1
+HEADER = struct.Struct("=8sIB3xiI")
+
+
+class DistanceTable():
+
+    def __init__(self, source, person_ids, person_order, movie_ids,
+                 distance, parent, parent_movie):
+        # Index of the source in person_ids
+        self.source = source
+        self.person_ids = person_ids
+        self.person_order = person_order
+        self.movie_ids = movie_ids
+        # For each person index : degrees from the source (-1 if not
+        # connected), and previous person and movie on a shortest path
+        self.distance = distance
+        self.parent = parent
+        self.parent_movie = parent_movie
+
+    @classmethod
+    def build(cls, source, person_ids, movie_ids, neighbors,
+              person_order=None):
+        """
+        Runs one BFS from the person index source over every person
+        reachable, where neighbors(person) gives its (movie, person)
+        index pairs.
+        """
+        if person_order is None:
+            person_order = sorted_order(person_ids)
+        num_people = len(person_ids)
+        distance = array("i", [-1]) * num_people
+        parent = array("i", [-1]) * num_people
+        parent_movie = array("i", [-1]) * num_people
+
+        distance[source] = 0
+        frontier = deque([source])
+        while frontier:
+            person = frontier.popleft()
+            depth = distance[person] + 1
+            for movie, neighbor in neighbors(person):
+                if distance[neighbor] < 0:
+                    distance[neighbor] = depth
+                    parent[neighbor] = person
+                    parent_movie[neighbor] = movie
+                    frontier.append(neighbor)
+        return cls(source, person_ids, person_order, movie_ids,
+                   distance, parent, parent_movie)
+
+    @property
+    def source_id(self):
+        return self.person_ids[self.source]
+
+    def distance_to(self, person_id):
+        """
+        Returns the degrees of separation between the source and
+        person_id, or None if they are not connected.
+        """
+        person = find(self.person_ids, self.person_order, person_id)
+        if person is None or self.distance[person] < 0:
+            return None
+        return self.distance[person]
+
+    def path_to(self, person_id):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs from
+        the source to person_id, or None if they are not connected.
+        """
+        person = find(self.person_ids, self.person_order, person_id)
+        if person is None or self.distance[person] < 0:
+            return None
+        path = []
+        while person != self.source:
+            path.append((self.movie_ids[self.parent_movie[person]],
+                         self.person_ids[person]))
+            person = self.parent[person]
+        path.reverse()
+        return path
+
+    def save(self, filename):
+        """
+        Writes the table, with its id tables, to filename.
+        """
+        byteorder = 0 if sys.byteorder == "little" else 1
+        arrays = [
+            ("B", self.person_ids.blob), ("q", self.person_ids.offsets),
+            ("i", self.person_order),
+            ("B", self.movie_ids.blob), ("q", self.movie_ids.offsets),
+            ("i", self.distance),
+            ("i", self.parent),
+            ("i", self.parent_movie),
+        ]
+        header = HEADER.pack(MAGIC, VERSION, byteorder,
+                             self.source, len(arrays))
+        write_arrays(filename, header, arrays)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Memory-maps a table written by save.
+        """
+        with open(filename, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(buffer)
+        magic, version, byteorder, source, count = HEADER.unpack_from(view)
+        if (magic != MAGIC or version != VERSION
+                or byteorder != (0 if sys.byteorder == "little" else 1)):
+            raise ValueError(f"{filename} is not a distance table")
+        (person_blob, person_offsets, person_order, movie_blob,
+         movie_offsets, distance, parent, parent_movie) = read_arrays(
+            view, HEADER.size, count)
+        table = cls(source,
+                    StringTable(person_blob, person_offsets), person_order,
+                    StringTable(movie_blob, movie_offsets),
+                    distance, parent, parent_movie)
+        # keep the mapping alive as long as the table
+        table.mmap = buffer
+        return table
@@ -0,0 +1,438 @@
+"""
+Compact graph store for the degrees dataset.
+
+People and movies are interned to dense ints (their row in the
+tables below) and the person <-> movie bipartite adjacency is kept
+as two CSR structures : for person p, its movies are
+person_movies[person_offsets[p]:person_offsets[p + 1]], and for
+movie m, its stars are movie_stars[movie_offsets[m]:movie_offsets[m + 1]].
+
+Everything is held in flat `array`s and utf-8 blobs instead of the
+dicts of dicts of sets built by degrees.load_data, which is roughly
+an order of magnitude smaller on the large dataset.
+
+The graph can also be compiled once to a binary snapshot next to
+the CSV files (python graph.py directory), which later runs
+memory-map instead of parsing the CSV files again.
+"""
+
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+
+class StringTable():
+    """
+    Read-only sequence of strings packed in a single utf-8 blob.
+
+    String i is blob[offsets[i]:offsets[i + 1]].
+    """
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        blob = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            blob += string.encode("utf-8")
+            offsets.append(len(blob))
+        return cls(bytes(blob), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class SortedKeys():
+    """
+    View of a StringTable in the order given by `order`, so that
+    `bisect` can search it without materializing the keys.
+    """
+    def __init__(self, table, order, lower=False):
+        self.table = table
+        self.order = order
+        self.lower = lower
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        key = self.table[self.order[i]]
+        return key.lower() if self.lower else key
+
+
+def sorted_order(table, lower=False):
+    """
+    Returns an array of the indices of table, sorted by string.
+    """
+    if lower:
+        key = lambda i: table[i].lower()
+    else:
+        key = table.__getitem__
+    return array("i", sorted(range(len(table)), key=key))
+
+
+def find(table, order, key):
+    """
+    Returns the index of key in table, given the sorted order of
+    table, or None if key is not in table.
+    """
+    keys = SortedKeys(table, order)
+    i = bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        return order[i]
+    return None
+
+
+def csr(num_rows, pairs):
+    """
+    Returns (offsets, indices) for a list of (row, col) int pairs
+    already sorted by row.
+    """
+    offsets = array("q", [0]) * (num_rows + 1)
+    indices = array("i", [0]) * len(pairs)
+    for k, (row, col) in enumerate(pairs):
+        offsets[row + 1] += 1
+        indices[k] = col
+    for row in range(num_rows):
+        offsets[row + 1] += offsets[row]
+    return offsets, indices
+
+
+class CompactGraph():
+
+    # Attributes of the graph, in snapshot order : StringTables are
+    # stored as their blob then their offsets
+    FIELDS = (
+        ("person_ids", "str"),
+        ("person_names", "str"),
+        ("person_births", "str"),
+        ("movie_ids", "str"),
+        ("movie_titles", "str"),
+        ("movie_years", "str"),
+        ("person_order", "i"),
+        ("movie_order", "i"),
+        ("name_order", "i"),
+        ("person_offsets", "q"),
+        ("person_movies", "i"),
+        ("movie_offsets", "q"),
+        ("movie_stars", "i"),
+    )
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_order, movie_order, name_order,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_stars):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        # Indices sorted by id / by lowercase name, for bisect lookups
+        self.person_order = person_order
+        self.movie_order = movie_order
+        self.name_order = name_order
+        # CSR adjacency
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Builds the graph from the people.csv, movies.csv and
+        stars.csv files of directory.
+        """
+        person_index = {}
+        ids, names, births = [], [], []
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row["id"] in person_index:
+                    continue
+                person_index[row["id"]] = len(ids)
+                ids.append(row["id"])
+                names.append(row["name"])
+                births.append(row["birth"])
+        person_ids = StringTable.from_strings(ids)
+        person_names = StringTable.from_strings(names)
+        person_births = StringTable.from_strings(births)
+
+        movie_index = {}
+        ids, titles, years = [], [], []
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row["id"] in movie_index:
+                    continue
+                movie_index[row["id"]] = len(ids)
+                ids.append(row["id"])
+                titles.append(row["title"])
+                years.append(row["year"])
+        movie_ids = StringTable.from_strings(ids)
+        movie_titles = StringTable.from_strings(titles)
+        movie_years = StringTable.from_strings(years)
+        del ids, names, births, titles, years
+
+        # Unique (person, movie) edges, skipping unknown ids
+        edges = set()
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person = person_index.get(row["person_id"])
+                movie = movie_index.get(row["movie_id"])
+                if person is not None and movie is not None:
+                    edges.add((person, movie))
+        num_people = len(person_index)
+        num_movies = len(movie_index)
+        del person_index, movie_index
+
+        edges = sorted(edges)
+        person_offsets, person_movies = csr(num_people, edges)
+        edges.sort(key=lambda edge: (edge[1], edge[0]))
+        movie_offsets, movie_stars = csr(
+            num_movies, [(movie, person) for person, movie in edges])
+        del edges
+
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   sorted_order(person_ids),
+                   sorted_order(movie_ids),
+                   sorted_order(person_names, lower=True),
+                   person_offsets, person_movies,
+                   movie_offsets, movie_stars)
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def person_index(self, person_id):
+        """
+        Returns the int index of a person id, or None if unknown.
+        """
+        return find(self.person_ids, self.person_order, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the int index of a movie id, or None if unknown.
+        """
+        return find(self.movie_ids, self.movie_order, movie_id)
+
+    def people_for_name(self, name):
+        """
+        Returns the list of person indices whose name matches,
+        case insensitively.
+        """
+        name = name.lower()
+        keys = SortedKeys(self.person_names, self.name_order, lower=True)
+        i = bisect_left(keys, name)
+        people = []
+        while i < len(keys) and keys[i] == name:
+            people.append(self.name_order[i])
+            i += 1
+        return people
+
+    def movies_for_person(self, person):
+        return self.person_movies[self.person_offsets[person]:
+                                  self.person_offsets[person + 1]]
+
+    def stars_for_movie(self, movie):
+        return self.movie_stars[self.movie_offsets[movie]:
+                                self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people who starred
+        with a given person, in O(degree).
+        """
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        neighbors = set()
+        for movie in self.movies_for_person(person):
+            for k in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                neighbors.add((movie, movie_stars[k]))
+        return neighbors
+
+
+# Binary snapshot
+# ---------------
+# Layout, in native byte order :
+#   header   : magic, version, byte order, signature of the CSV files
+#   sections : (typecode, offset, byte length) for each array
+#   data     : the arrays, each aligned on 8 bytes
+SNAPSHOT_NAME = "degrees.snapshot"
+SNAPSHOT_MAGIC = b"DEGSNAP\0"
+SNAPSHOT_VERSION = 1
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+HEADER = struct.Struct("=8sIB3x" + "q" * 2 * len(SOURCES) + "I")
+SECTION = struct.Struct("=c7xqq")
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def source_signature(directory):
+    """
+    Returns the (mtime, size) of each CSV file of directory, flattened.
+    """
+    signature = []
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        signature += [stat.st_mtime_ns, stat.st_size]
+    return signature
+
+
+def snapshot_arrays(graph):
+    """
+    Returns the list of (typecode, array) to write for a graph.
+    """
+    arrays = []
+    for field, kind in CompactGraph.FIELDS:
+        value = getattr(graph, field)
+        if kind == "str":
+            arrays.append(("B", value.blob))
+            arrays.append(("q", value.offsets))
+        else:
+            arrays.append((kind, value))
+    return arrays
+
+
+def save_snapshot(graph, directory, signature):
+    """
+    Writes the snapshot of graph for directory, tagged with the
+    signature of the CSV files it was built from.
+    """
+    arrays = snapshot_arrays(graph)
+    byteorder = 0 if sys.byteorder == "little" else 1
+    header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, byteorder,
+                         *signature, len(arrays))
+    write_arrays(snapshot_path(directory), header, arrays)
+
+
+def write_arrays(path, header, arrays):
+    """
+    Writes header, then the section table and data of a list of
+    (typecode, array) to path.
+    """
+    offset = len(header) + SECTION.size * len(arrays)
+    sections = []
+    for typecode, values in arrays:
+        offset += -offset % 8
+        nbytes = memoryview(values).nbytes
+        sections.append(SECTION.pack(typecode.encode(), offset, nbytes))
+        offset += nbytes
+
+    # Write to a temporary file first, so that a concurrent reader
+    # never sees a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(b"".join(sections))
+        for typecode, values in arrays:
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(memoryview(values).cast("B"))
+    os.replace(tmp_path, path)
+
+
+def read_arrays(view, start, count):
+    """
+    Returns the list of the `count` arrays whose section table
+    starts at `start` in view, as memoryviews on view.
+    """
+    arrays = []
+    for k in range(count):
+        typecode, offset, nbytes = SECTION.unpack_from(
+            view, start + k * SECTION.size)
+        arrays.append(view[offset:offset + nbytes].cast(typecode.decode()))
+    return arrays
+
+
+def load_snapshot(directory):
+    """
+    Memory-maps the snapshot of directory and returns its graph,
+    or None if there is no snapshot or if it is stale.
+    """
+    try:
+        signature = source_signature(directory)
+        with open(snapshot_path(directory), "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        return None
+    magic, version, byteorder, *stored, count = HEADER.unpack_from(view)
+    if (magic != SNAPSHOT_MAGIC
+            or version != SNAPSHOT_VERSION
+            or byteorder != (0 if sys.byteorder == "little" else 1)
+            or stored != signature):
+        return None
+
+    arrays = read_arrays(view, HEADER.size, count)
+    arrays.reverse()
+
+    fields = []
+    for field, kind in CompactGraph.FIELDS:
+        if kind == "str":
+            fields.append(StringTable(arrays.pop(), arrays.pop()))
+        else:
+            fields.append(arrays.pop())
+    graph = CompactGraph(*fields)
+    # keep the mapping alive as long as the graph
+    graph.mmap = buffer
+    return graph
+
+
+def load_graph(directory):
+    """
+    Returns the graph of directory from its snapshot, compiling
+    the snapshot first if it is missing or stale.
+    """
+    graph = load_snapshot(directory)
+    if graph is not None:
+        return graph
+    signature = source_signature(directory)
+    graph = CompactGraph.from_csv(directory)
+    try:
+        save_snapshot(graph, directory, signature)
+    except OSError:
+        # read-only dataset : keep the in-memory graph
+        pass
+    return graph
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python graph.py directory")
+    directory = sys.argv[1]
+    path = snapshot_path(directory)
+    if load_snapshot(directory) is not None:
+        print(f"Snapshot {path} is up to date")
+        return
+    print("Compiling snapshot...")
+    signature = source_signature(directory)
+    graph = CompactGraph.from_csv(directory)
+    try:
+        save_snapshot(graph, directory, signature)
+    except OSError as e:
+        sys.exit(f"Could not write snapshot {path}: {e}")
+    print(f"Snapshot written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import csv
+import gc
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import degrees
+import graph
+
+
+SMALL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "small")
+
+
+def random_graph(rng, size, edges):
+    """
+    Returns the neighbors function of a random undirected graph of
+    size nodes, where the action of an edge is its (lower, upper)
+    pair of nodes.
+    """
+    adjacency = {node: set() for node in range(size)}
+    for _ in range(edges):
+        a, b = rng.randrange(size), rng.randrange(size)
+        edge = (min(a, b), max(a, b))
+        adjacency[a].add((edge, b))
+        adjacency[b].add((edge, a))
+    return lambda node: adjacency[node]
+
+
+class DegreesTestCase(unittest.TestCase):
+    """
+    Works on a copy of small/, so that snapshots and tables are not
+    written to the tree, and resets the data loaded by degrees.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, "small")
+        shutil.copytree(SMALL, self.directory,
+                        ignore=shutil.ignore_patterns(graph.SNAPSHOT_NAME))
+        with open(os.path.join(SMALL, "people.csv"), encoding="utf-8") as f:
+            self.ids = [row["id"] for row in csv.DictReader(f)]
+
+    def tearDown(self):
+        self.reset()
+        self.tmp.cleanup()
+
+    def reset(self):
+        degrees.names.clear()
+        degrees.people.clear()
+        degrees.movies.clear()
+        degrees.graph = None
+        degrees.distance_tables.clear()
+
+    def load(self, compact=False):
+        """
+        Loads the copy of small/ : in the dicts, or with compact=True
+        in a CompactGraph, from a snapshot compiled on first use.
+        """
+        self.reset()
+        degrees.load_data(self.directory, compact=compact)
+        self.assertEqual(degrees.graph is not None, compact)
+
+    def assertValidPath(self, path, source, target, neighbors):
+        state = source
+        for step in path:
+            self.assertIn(step, neighbors(state))
+            state = step[1]
+        self.assertEqual(state, target)
+
+    def bfs_length(self, source, target):
+        path = degrees.breadth_first_search(source, target,
+                                            degrees.neighbors_for_person)
+        return None if path is None else len(path)
+
+
+class TestBidirectional(DegreesTestCase):
+
+    def assertSameLength(self, source, target, neighbors):
+        expected = degrees.breadth_first_search(source, target, neighbors)
+        path = degrees.bidirectional_search(source, target, neighbors)
+        if expected is None:
+            self.assertIsNone(path)
+            return
+        self.assertIsNotNone(path)
+        self.assertEqual(len(path), len(expected))
+        self.assertValidPath(path, source, target, neighbors)
+
+    def test_00_random_graphs(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            size = rng.randint(1, 30)
+            neighbors = random_graph(rng, size, rng.randint(0, 2 * size))
+            for _ in range(5):
+                source, target = rng.randrange(size), rng.randrange(size)
+                with self.subTest(size=size, source=source, target=target):
+                    self.assertSameLength(source, target, neighbors)
+
+    def test_10_small(self):
+        self.load()
+        for source in self.ids:
+            for target in self.ids:
+                with self.subTest(source=source, target=target):
+                    self.assertSameLength(source, target,
+                                          degrees.neighbors_for_person)
+
+
+class TestCompactGraph(DegreesTestCase):
+
+    def answers(self, compact):
+        """
+        Returns everything the loaded store answers about small/.
+        """
+        self.load(compact)
+        with open(os.path.join(SMALL, "people.csv"), encoding="utf-8") as f:
+            names = [row["name"] for row in csv.DictReader(f)]
+        names += [name.upper() for name in names] + ["Nobody Famous"]
+        return {
+            "neighbors": {person: degrees.neighbors_for_person(person)
+                          for person in self.ids},
+            "names": {name: sorted(degrees.person_ids_for_name(name))
+                      for name in names},
+            "people": {person: degrees.person_for_id(person)["name"]
+                       for person in self.ids},
+            "degrees": {(source, target): None if path is None else len(path)
+                        for source in self.ids for target in self.ids
+                        for path in [degrees.shortest_path(source, target)]},
+        }
+
+    def test_00_same_answers(self):
+        # The dicts first : compact=True writes the snapshot, which
+        # load_data would then read instead of the CSV files
+        expected = self.answers(compact=False)
+        self.assertFalse(os.path.exists(graph.snapshot_path(self.directory)))
+        answers = self.answers(compact=True)
+        for key in expected:
+            with self.subTest(key=key):
+                self.assertEqual(answers[key], expected[key])
+        # and again from the memory-mapped snapshot it wrote
+        self.assertTrue(os.path.exists(graph.snapshot_path(self.directory)))
+        self.assertEqual(self.answers(compact=True), expected)
+
+
+class TestDistanceTable(DegreesTestCase):
+
+    def test_00_paths(self):
+        # Paths from the source are read from the table, and paths to
+        # it are the reversed ones, as short as a search
+        for compact in (False, True):
+            self.load(compact)
+            for source in self.ids:
+                degrees.distance_tables.clear()
+                degrees.distance_table(source)
+                for person in self.ids:
+                    for start, end in ((source, person), (person, source)):
+                        with self.subTest(compact=compact, start=start,
+                                          end=end):
+                            stats = {}
+                            path = degrees.shortest_path(start, end,
+                                                         stats=stats)
+                            self.assertEqual(stats["num_explored"], 0)
+                            expected = self.bfs_length(start, end)
+                            if expected is None:
+                                self.assertIsNone(path)
+                                continue
+                            self.assertEqual(len(path), expected)
+                            self.assertValidPath(
+                                path, start, end,
+                                degrees.neighbors_for_person)
+
+    def test_10_save_load(self):
+        self.load()
+        filename = os.path.join(self.tmp.name, "102.distances")
+        table = degrees.distance_table("102")
+        table.save(filename)
+
+        degrees.distance_tables.clear()
+        loaded = degrees.load_distance_table(filename)
+        self.assertEqual(loaded.source_id, "102")
+        self.assertIs(degrees.distance_tables["102"], loaded)
+        for person in self.ids + ["unknown"]:
+            with self.subTest(person=person):
+                self.assertEqual(loaded.distance_to(person),
+                                 table.distance_to(person))
+                self.assertEqual(loaded.path_to(person),
+                                 table.path_to(person))
+        self.assertEqual(loaded.distance_to("102"), 0)
+        self.assertIsNone(loaded.distance_to("914612"))
+
+    def test_20_not_a_table(self):
+        filename = os.path.join(self.tmp.name, "people.distances")
+        shutil.copy(os.path.join(self.directory, "people.csv"), filename)
+        with self.assertRaises(ValueError):
+            degrees.load_distance_table(filename)
+
+
+class TestBatch(DegreesTestCase):
+
+    QUERIES = [
+        # 102 is the source of several queries : one BFS tree
+        ("Kevin Bacon", "Tom Hanks"),
+        ("102", "Tom Cruise"),
+        ("102", "705"),
+        ("kevin bacon", "Emma Watson"),
+        ("102", "102"),
+        # a single query from 158
+        ("Tom Hanks", "Valeria Golino"),
+        ("Nobody Famous", "Tom Hanks"),
+        ("Tom Hanks", "999999"),
+    ]
+
+    def test_00_read_queries(self):
+        filename = os.path.join(self.tmp.name, "queries.csv")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write("# source,target\n"
+                    "Kevin Bacon, Tom Hanks\n"
+                    "\n"
+                    "102,\"Robin Wright\"\n")
+        self.assertEqual(degrees.read_queries(filename),
+                         [("Kevin Bacon", "Tom Hanks"),
+                          ("102", "Robin Wright")])
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write("102,158,129\n")
+        with self.assertRaises(ValueError):
+            degrees.read_queries(filename)
+
+    def test_10_batch(self):
+        for compact in (False, True):
+            for workers in (1, 2):
+                self.load(compact)
+                records = list(degrees.batch_queries(self.QUERIES,
+                                                     workers=workers))
+                self.assertEqual(gc.get_freeze_count(), 0)
+                self.assertEqual(len(records), len(self.QUERIES))
+                by_query = {(record["source"], record["target"]): record
+                            for record in records}
+                self.assertEqual(set(by_query), set(self.QUERIES))
+                for query, record in by_query.items():
+                    with self.subTest(compact=compact, workers=workers,
+                                      query=query):
+                        source = degrees.resolve_person(query[0])
+                        target = degrees.resolve_person(query[1])
+                        if source is None or target is None:
+                            missing = query[0] if source is None else query[1]
+                            self.assertEqual(record["error"],
+                                             "unknown or ambiguous person: "
+                                             f"{missing}")
+                            continue
+                        path = degrees.shortest_path(source, target)
+                        if path is None:
+                            self.assertIsNone(record["degrees"])
+                            self.assertIsNone(record["path"])
+                            continue
+                        self.assertEqual(record["degrees"], len(path))
+                        self.assertValidPath(
+                            [tuple(step) for step in record["path"]],
+                            source, target, degrees.neighbors_for_person)
+
+    def test_20_close_early(self):
+        self.load()
+        records = degrees.batch_queries(self.QUERIES, workers=2)
+        next(records)
+        records.close()
+        self.assertEqual(gc.get_freeze_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import graph
+
+
+SMALL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "small")
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, "small")
+        shutil.copytree(SMALL, self.directory,
+                        ignore=shutil.ignore_patterns(graph.SNAPSHOT_NAME))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def snapshot_bytes(self, g):
+        return [bytes(value) for _, value in graph.snapshot_arrays(g)]
+
+    def test_00_missing(self):
+        self.assertIsNone(graph.load_snapshot(self.directory))
+
+    def test_10_round_trip(self):
+        compiled = graph.load_graph(self.directory)
+        self.assertTrue(os.path.exists(graph.snapshot_path(self.directory)))
+        loaded = graph.load_snapshot(self.directory)
+        self.assertIsNotNone(loaded)
+        self.assertEqual(self.snapshot_bytes(loaded),
+                         self.snapshot_bytes(compiled))
+        self.assertEqual(self.snapshot_bytes(loaded),
+                         self.snapshot_bytes(
+                             graph.CompactGraph.from_csv(self.directory)))
+        self.assertEqual(len(loaded.person_names),
+                         len(compiled.person_names))
+        self.assertEqual(loaded.person_names[0], compiled.person_names[0])
+
+    def test_20_stale_mtime(self):
+        graph.load_graph(self.directory)
+        path = os.path.join(self.directory, "stars.csv")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(graph.load_snapshot(self.directory))
+        # load_graph compiles it again
+        graph.load_graph(self.directory)
+        self.assertIsNotNone(graph.load_snapshot(self.directory))
+
+    def test_30_stale_size(self):
+        graph.load_graph(self.directory)
+        path = os.path.join(self.directory, "people.csv")
+        stat = os.stat(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("999999,Someone New,1999\n")
+        # same mtime, so that only the size differs
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNone(graph.load_snapshot(self.directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,45 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class IndexedStackFrontier():
+    """
+    Stack frontier backed by a deque, with a state -> node index.
+
+    add, remove, empty and contains_state are all O(1), where
+    StackFrontier scans the list for contains_state and copies
+    it on every remove.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.index = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.index[node.state] = node
+
+    def contains_state(self, state):
+        return state in self.index
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def _pop(self):
+        return self.frontier.pop()
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self._pop()
+            # only forget the state if no newer node was added for it
+            if self.index.get(node.state) is node:
+                del self.index[node.state]
+            return node
+
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def _pop(self):
+        return self.frontier.popleft()
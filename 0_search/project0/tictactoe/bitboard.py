@@ -0,0 +1,157 @@
+"""
+Bitboard backend for the Tic Tac Toe player.
+
+A position is a pair of 9-bit ints (x, o), one per player, where
+bit 3 * i + j is set when that player has a mark on cell (i, j).
+Making or undoing a move and checking for a win are then single
+bitwise operations, instead of the list copies and NumPy arrays of
+tictactoe.py.
+
+from_board and to_board convert from and to the list of lists
+boards of tictactoe.py, and minimax takes and returns the same
+values as tictactoe.minimax, so it can be used as a drop-in.
+"""
+
+from functools import lru_cache
+
+from tictactoe import X, O, EMPTY
+
+
+# All 9 cells
+FULL = 0b111111111
+
+# Rows, columns and diagonals
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+
+def cell(action):
+    """
+    Returns the bit index of action (i, j).
+    """
+    i, j = action
+    return 3 * i + j
+
+
+def action(cell):
+    """
+    Returns the action (i, j) of a bit index.
+    """
+    return divmod(cell, 3)
+
+
+def from_board(board):
+    """
+    Returns the (x, o) bitboards of a list of lists board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, value in enumerate(row):
+            if value == X:
+                x |= 1 << (3 * i + j)
+            elif value == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list of lists board of (x, o) bitboards.
+    """
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY
+             for j in range(3)]
+            for i in range(3)]
+
+
+def player(x, o):
+    """
+    Returns the player who has the next turn.
+    """
+    return X if bin(x).count("1") <= bin(o).count("1") else O
+
+
+def actions(x, o):
+    """
+    Returns the list of the empty cells (bit indices), in order.
+    """
+    empty = ~(x | o) & FULL
+    return [c for c in range(9) if empty >> c & 1]
+
+
+def move(bits, cell):
+    """
+    Returns the bitboard of a player after playing cell.
+    """
+    return bits | 1 << cell
+
+
+def undo(bits, cell):
+    """
+    Returns the bitboard of a player before playing cell.
+    """
+    return bits ^ 1 << cell
+
+
+def has_won(bits):
+    """
+    Returns True if a player bitboard holds a row, column or diagonal.
+    """
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+def winner(x, o):
+    """
+    Returns X or O if it has won, else 0 like tictactoe.winner.
+    """
+    if has_won(x):
+        return X
+    if has_won(o):
+        return O
+    return 0
+
+
+def terminal(x, o):
+    return has_won(x) or has_won(o) or (x | o) == FULL
+
+
+def utility(x, o):
+    if has_won(x):
+        return 1
+    if has_won(o):
+        return -1
+    return 0
+
+
+@lru_cache(maxsize=None)
+def minimax_value(x, o):
+    """
+    Returns the minimax value of a position. Every one of the
+    few thousand reachable positions is searched only once.
+    """
+    if terminal(x, o):
+        return utility(x, o)
+    if player(x, o) == X:
+        return max(minimax_value(move(x, c), o) for c in actions(x, o))
+    return min(minimax_value(x, move(o, c)) for c in actions(x, o))
+
+
+def minimax(board):
+    """
+    Returns the optimal action (i, j) for the current player on a
+    list of lists board, or None if the board is terminal.
+    Ties are broken by the first cell in row-major order.
+    """
+    x, o = from_board(board)
+    if terminal(x, o):
+        return None
+    if player(x, o) == X:
+        best = max(actions(x, o), key=lambda c: minimax_value(move(x, c), o))
+    else:
+        best = min(actions(x, o), key=lambda c: minimax_value(x, move(o, c)))
+    return action(best)
@@ -0,0 +1,173 @@
+"""
+Perfect-play lookup table for Tic Tac Toe.
+
+Only 5,478 positions can be reached from the initial state, so
+they can all be solved once and stored in a small file : run
+
+    python lookup.py
+
+to write tictactoe.table. tictactoe.minimax then answers from it
+in O(1) instead of searching.
+
+The table is an array of 3**9 16-bit entries indexed by
+tictactoe.board_key. Entry 0 marks an unreachable position,
+otherwise bits 0-1 hold the minimax value + 2, and bits 2-10 the
+cells (3 * i + j) of all the optimal moves.
+"""
+
+import os
+import sys
+from array import array
+from functools import lru_cache
+
+import tictactoe as ttt
+import bitboard
+
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "tictactoe.table")
+MAGIC = b"TTTTABLE"
+VERSION = 1
+SIZE = 3 ** 9
+
+
+def key(x, o):
+    """
+    Returns tictactoe.board_key of a bitboard position.
+    """
+    key = 0
+    for c in range(9):
+        key = 3 * key + (1 if x >> c & 1 else 2 if o >> c & 1 else 0)
+    return key
+
+
+def reachable_states():
+    """
+    Returns the list of all (x, o) bitboards reachable from the
+    initial state, terminal ones included.
+    """
+    seen = {(0, 0)}
+    stack = [(0, 0)]
+    while stack:
+        x, o = stack.pop()
+        if bitboard.terminal(x, o):
+            continue
+        for c in bitboard.actions(x, o):
+            if bitboard.player(x, o) == ttt.X:
+                child = (bitboard.move(x, c), o)
+            else:
+                child = (x, bitboard.move(o, c))
+            if child not in seen:
+                seen.add(child)
+                stack.append(child)
+    return list(seen)
+
+
+def build_table():
+    """
+    Returns the table entries of every reachable state.
+    """
+    entries = array("H", [0]) * SIZE
+    for x, o in reachable_states():
+        value = bitboard.minimax_value(x, o)
+        best = 0
+        if not bitboard.terminal(x, o):
+            for c in bitboard.actions(x, o):
+                if bitboard.player(x, o) == ttt.X:
+                    child = bitboard.minimax_value(bitboard.move(x, c), o)
+                else:
+                    child = bitboard.minimax_value(x, bitboard.move(o, c))
+                if child == value:
+                    best |= 1 << c
+        entries[key(x, o)] = (value + 2) | best << 2
+    return entries
+
+
+def save_table(entries, filename=TABLE_FILE):
+    with open(filename, "wb") as f:
+        f.write(MAGIC)
+        f.write(array("H", [VERSION]).tobytes())
+        entries.tofile(f)
+
+
+def load_table(filename=TABLE_FILE):
+    """
+    Returns the table entries of filename, or None if it is
+    missing or not a table.
+    """
+    try:
+        with open(filename, "rb") as f:
+            header = f.read(len(MAGIC) + 2)
+            entries = array("H")
+            entries.fromfile(f, SIZE)
+    except (OSError, EOFError):
+        return None
+    if header != MAGIC + array("H", [VERSION]).tobytes():
+        return None
+    return entries
+
+
+@lru_cache(maxsize=None)
+def default_table():
+    """
+    Returns the entries of TABLE_FILE, loaded once per process.
+    """
+    return load_table()
+
+
+def lookup(entries, board):
+    """
+    Returns (value, optimal actions) of board from the table,
+    or None if the board is not a reachable position.
+    """
+    entry = entries[ttt.board_key(board)]
+    if entry == 0:
+        return None
+    best = entry >> 2
+    return (entry & 0b11) - 2, [divmod(c, 3) for c in range(9) if best >> c & 1]
+
+
+def best_action(board, entries=None):
+    """
+    Returns the first optimal action of board from the table, or
+    None if there is no table, the board is not in it, or it is
+    terminal.
+    """
+    if entries is None:
+        entries = default_table()
+        if entries is None:
+            return None
+    found = lookup(entries, board)
+    if found is None or not found[1]:
+        return None
+    return found[1][0]
+
+
+def verify(entries):
+    """
+    Returns the list of the reachable boards whose table value
+    differs from tictactoe.minimax_value, or is missing.
+    """
+    mismatches = []
+    for x, o in reachable_states():
+        board = bitboard.to_board(x, o)
+        found = lookup(entries, board)
+        if found is None or found[0] != ttt.minimax_value(board):
+            mismatches.append(board)
+    return mismatches
+
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else TABLE_FILE
+    print("Solving all positions...")
+    entries = build_table()
+    print("Checking against minimax_value...")
+    mismatches = verify(entries)
+    if mismatches:
+        sys.exit(f"{len(mismatches)} positions differ, table not written.")
+    save_table(entries, filename)
+    print(f"Table of {len(reachable_states())} positions written to {filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+m,n,k-game player : Tic Tac Toe on an m x n board (m rows, n
+columns) where k marks in a row, column or diagonal win.
+
+Boards are lists of lists of X, O and EMPTY like in tictactoe.py,
+and MNKGame(3, 3, 3) plays the same game. Beyond 3x3 an exhaustive
+minimax never finishes, so best_move runs an iterative deepening
+alpha-beta search, scoring the positions where it stops with a
+heuristic, and returns the best move of the deepest search that
+fits in a wall-clock budget.
+"""
+
+import random
+import time
+from functools import partial
+
+from parallel import best_action as first_best_action
+from tictactoe import X, O, EMPTY
+
+
+# Score of a win, above any heuristic score ; wins found sooner
+# score higher
+WIN = 10 ** 9
+
+# Share of the time budget spent searching, the rest is a margin
+# to unwind the search and return the move
+SEARCH_SHARE = 0.95
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class MNKGame():
+
+    def __init__(self, m=3, n=3, k=3):
+        if not 1 <= k <= max(m, n):
+            raise ValueError(f"cannot align {k} on a {m}x{n} board")
+        self.m = m
+        self.n = n
+        self.k = k
+
+        # Every window of k aligned cells, and the windows through each cell
+        self.lines = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + (k - 1) * di, j + (k - 1) * dj
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.lines.append(tuple((i + s * di, j + s * dj)
+                                                for s in range(k)))
+        self.lines_through = {(i, j): [] for i in range(m) for j in range(n)}
+        for line in self.lines:
+            for cell in line:
+                self.lines_through[cell].append(line)
+
+        # Zobrist keys of each (cell, player), to hash positions
+        # incrementally during the search
+        rng = random.Random(0)
+        self.zobrist = {(cell, p): rng.getrandbits(64)
+                        for cell in self.lines_through for p in (X, O)}
+
+        # Best move of each position in the last search iteration,
+        # tried first in the next one
+        self.best_moves = {}
+        self.nodes = 0
+
+    def initial_state(self):
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def player(self, board):
+        count = sum(row.count(X) - row.count(O) for row in board)
+        return X if count <= 0 else O
+
+    def actions(self, board):
+        return {(i, j) for i, row in enumerate(board)
+                for j, cell in enumerate(row) if cell == EMPTY}
+
+    def result(self, board, action):
+        i, j = action
+        if not (0 <= i < self.m and 0 <= j < self.n) or board[i][j] != EMPTY:
+            raise ValueError(f"action {action} is not allowed on {board}")
+        new_board = [row[:] for row in board]
+        new_board[i][j] = self.player(board)
+        return new_board
+
+    def winner(self, board):
+        """
+        Returns X or O if it has k in a row, else 0 like
+        tictactoe.winner.
+        """
+        for line in self.lines:
+            first = board[line[0][0]][line[0][1]]
+            if first != EMPTY and all(board[i][j] == first for i, j in line):
+                return first
+        return 0
+
+    def terminal(self, board):
+        return (self.winner(board) != 0
+                or all(cell != EMPTY for row in board for cell in row))
+
+    def utility(self, board):
+        winner = self.winner(board)
+        return 1 if winner == X else -1 if winner == O else 0
+
+    def wins(self, board, action):
+        """
+        Returns True if the mark on action completes a line.
+        """
+        i, j = action
+        mark = board[i][j]
+        return any(all(board[a][b] == mark for a, b in line)
+                   for line in self.lines_through[action])
+
+    def evaluate(self, board):
+        """
+        Heuristic score of a non terminal board for X : each line
+        still open to a single player scores 4 ** (marks on it)
+        for that player.
+        """
+        score = 0
+        for line in self.lines:
+            x = o = 0
+            for i, j in line:
+                cell = board[i][j]
+                if cell == X:
+                    x += 1
+                elif cell == O:
+                    o += 1
+            if x and not o:
+                score += 4 ** x
+            elif o and not x:
+                score -= 4 ** o
+        return score
+
+    def candidate_actions(self, board):
+        """
+        Returns the empty cells to search, closest to the center
+        first. Beyond 3x3, only the cells next to a mark are
+        searched (the center cell on an empty board).
+        """
+        candidates = set()
+        if self.m * self.n > 9:
+            for i, row in enumerate(board):
+                for j, cell in enumerate(row):
+                    if cell == EMPTY:
+                        continue
+                    for a in range(max(0, i - 1), min(self.m, i + 2)):
+                        for b in range(max(0, j - 1), min(self.n, j + 2)):
+                            if board[a][b] == EMPTY:
+                                candidates.add((a, b))
+            if not candidates and board[self.m // 2][self.n // 2] == EMPTY:
+                if all(cell == EMPTY for row in board for cell in row):
+                    return [(self.m // 2, self.n // 2)]
+        if not candidates:
+            candidates = self.actions(board)
+        return sorted(candidates,
+                      key=lambda c: (abs(2 * c[0] - self.m + 1)
+                                     + abs(2 * c[1] - self.n + 1), c))
+
+    def best_move(self, board, time_budget=1.0, max_depth=None,
+                  splitter=None):
+        """
+        Returns the best action found for the player to move within
+        time_budget seconds, or None if the board is terminal.
+        See search.
+        """
+        return self.search(board, time_budget, max_depth, splitter)[0]
+
+    def search(self, board, time_budget=1.0, max_depth=None, splitter=None):
+        """
+        Runs alpha-beta searches of increasing depth on board until
+        time_budget seconds are spent, each iteration trying first
+        the moves that were best in the previous one.
+
+        With a parallel.RootSplitter, the root actions of each
+        iteration are searched by its worker processes. Ties are
+        broken by the order of the previous iteration either way.
+
+        Returns (action, score, depth, nodes) : the best action and
+        its score (for the player to move) in the deepest completed
+        iteration, that depth, and the number of nodes searched (in
+        this process).
+        """
+        start = time.monotonic()
+        deadline = start + SEARCH_SHARE * time_budget
+        self.nodes = 0
+        if self.terminal(board):
+            return None, 0, 0, 0
+        board = [row[:] for row in board]
+        mark = self.player(board)
+        key = self.hash(board)
+        empty = sum(row.count(EMPTY) for row in board)
+        if max_depth is None:
+            max_depth = empty
+
+        root_actions = self.candidate_actions(board)
+        best_action, best_score, depth_done = root_actions[0], None, 0
+        self.best_moves = {}
+        for depth in range(1, max_depth + 1):
+            try:
+                if splitter is not None:
+                    evaluate = partial(self.action_score, depth=depth,
+                                       deadline=deadline)
+                    scores = splitter.search(evaluate, board, root_actions)
+                else:
+                    scores = {}
+                    alpha = -WIN - 1
+                    for action in root_actions:
+                        score = -self.negamax(board, key, action, mark,
+                                              depth - 1, -WIN - 1, -alpha,
+                                              1, deadline)
+                        scores[action] = score
+                        alpha = max(alpha, score)
+            except SearchTimeout:
+                break
+            # Next iteration (and the final answer) follows this one,
+            # first best action first
+            best_action = first_best_action(scores, root_actions)
+            root_actions.sort(key=lambda action: (action != best_action,
+                                                  -scores[action]))
+            best_score = scores[best_action]
+            depth_done = depth
+            # A forced win or loss will not change with more depth
+            if abs(best_score) > WIN - empty - 1 or depth >= empty:
+                break
+            # Stop if the next iteration will obviously not finish
+            if time.monotonic() + (time.monotonic() - start) > deadline:
+                break
+        return best_action, best_score, depth_done, self.nodes
+
+    def action_score(self, board, action, alpha, depth, deadline):
+        """
+        Returns the score of action for the player to move on board,
+        searched depth plies deep : exact if above alpha, otherwise
+        an upper bound at most alpha. Used by parallel.RootSplitter.
+        """
+        board = [row[:] for row in board]
+        alpha = max(alpha, -WIN - 1)
+        return -self.negamax(board, self.hash(board), action,
+                             self.player(board), depth - 1,
+                             -WIN - 1, -alpha, 1, deadline)
+
+    def hash(self, board):
+        key = 0
+        for i, row in enumerate(board):
+            for j, cell in enumerate(row):
+                if cell != EMPTY:
+                    key ^= self.zobrist[(i, j), cell]
+        return key
+
+    def negamax(self, board, key, action, mark, depth, alpha, beta, ply,
+                deadline):
+        """
+        Plays action for mark on board, in place, and returns the
+        score of the resulting position for the player to move,
+        searched depth more plies with the (alpha, beta) window.
+        The move is undone before returning.
+        """
+        self.nodes += 1
+        # nodes are slow enough to check the clock at each one
+        if time.monotonic() > deadline:
+            raise SearchTimeout()
+
+        i, j = action
+        board[i][j] = mark
+        key ^= self.zobrist[action, mark]
+        try:
+            # the player who just moved has won
+            if self.wins(board, action):
+                return -(WIN - ply)
+            other = O if mark == X else X
+            if depth == 0:
+                score = self.evaluate(board)
+                return score if other == X else -score
+            children = self.candidate_actions(board)
+            if not children:
+                return 0
+
+            # Best move of the previous iteration first
+            best_move = self.best_moves.get(key)
+            if best_move in children:
+                children.remove(best_move)
+                children.insert(0, best_move)
+
+            best = -WIN - 1
+            for child in children:
+                score = -self.negamax(board, key, child, other, depth - 1,
+                                      -beta, -alpha, ply + 1, deadline)
+                if score > best:
+                    best = score
+                    best_move = child
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+            self.best_moves[key] = best_move
+            return best
+        finally:
+            board[i][j] = EMPTY
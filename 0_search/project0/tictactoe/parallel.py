@@ -0,0 +1,115 @@
+"""
+Parallel root-split search.
+
+The actions of the root position are searched in a pool of worker
+processes, with the young brothers wait scheme : the first action
+is searched alone to get a bound, then all the others at once.
+Workers share the best score found so far through a shared int, so
+that an action starting late is searched with the tightest bound
+known.
+
+The best action is the first one, in the given order, with the best
+score, so the result does not depend on the number of workers nor
+on the order in which they finish.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Lower than any score
+LOWEST = -2 ** 62
+
+# Best score so far of the current root, shared by the workers
+shared_bound = None
+
+
+def init_worker(bound):
+    global shared_bound
+    shared_bound = bound
+
+
+def search_action(evaluate, board, action):
+    """
+    Runs in a worker : returns the score of action, searched with the
+    best score found so far by all the workers as bound.
+    """
+    # Scores equal to the bound must be exact, to break ties by order
+    value = evaluate(board, action, shared_bound.value - 1)
+    with shared_bound.get_lock():
+        if value > shared_bound.value:
+            shared_bound.value = value
+    return value
+
+
+def best_action(scores, actions):
+    """
+    Returns the first of actions with the best score.
+    """
+    best = max(scores[action] for action in actions)
+    return next(action for action in actions if scores[action] == best)
+
+
+class RootSplitter():
+    """
+    Pool of worker processes searching root actions in parallel,
+    kept alive across searches. Use it as a context manager, or
+    call close() when done.
+    """
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count()
+        self.bound = multiprocessing.Value("q", LOWEST)
+        self.executor = ProcessPoolExecutor(self.workers,
+                                            initializer=init_worker,
+                                            initargs=(self.bound,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def search(self, evaluate, board, actions):
+        """
+        Returns a dict mapping each action to its score for the player
+        to move on board, where evaluate(board, action, alpha) returns
+        the score of an action, exact if above alpha and otherwise an
+        upper bound at most alpha. evaluate must be picklable (a
+        module-level function, or a partial of one).
+
+        The score of the best action is exact, and best_action(scores,
+        actions) picks it. Any exception of evaluate is raised here.
+        """
+        actions = list(actions)
+        scores = {}
+        # Young brothers wait for the eldest one
+        scores[actions[0]] = evaluate(board, actions[0], LOWEST)
+        with self.bound.get_lock():
+            self.bound.value = scores[actions[0]]
+
+        futures = {action: self.executor.submit(search_action, evaluate,
+                                                board, action)
+                   for action in actions[1:]}
+        try:
+            for action, future in futures.items():
+                scores[action] = future.result()
+        finally:
+            for future in futures.values():
+                future.cancel()
+        return scores
+
+
+def root_split(evaluate, board, actions, workers=None):
+    """
+    Returns (best action, score) of board with a temporary
+    RootSplitter of workers processes. See RootSplitter.search.
+    """
+    actions = list(actions)
+    with RootSplitter(workers) as splitter:
+        scores = splitter.search(evaluate, board, actions)
+    action = best_action(scores, actions)
+    return action, scores[action]
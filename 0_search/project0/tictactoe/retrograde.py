@@ -0,0 +1,194 @@
+"""
+Retrograde analysis of Tic Tac Toe.
+
+Instead of searching down from a position like minimax_value, every
+position is solved bottom-up : positions are grouped by number of
+marks, terminal ones are scored with their utility, and scores are
+propagated from the positions with 9 marks back to the empty board,
+one level at a time, by removing the last mark of each position to
+get its predecessors. Each level is a handful of NumPy operations
+over all the positions, indexed by tictactoe.board_key.
+
+Scores also tell how fast a game ends : a position won by X in d
+plies scores 10 - d, won by O -(10 - d), and a draw 0. X picks the
+move of highest score and O the lowest, so the winner goes for the
+fastest win, and the loser for the slowest loss. Run
+
+    python retrograde.py
+
+to solve every position and check it against bitboard.minimax_value.
+"""
+
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+
+import tictactoe as ttt
+import bitboard
+
+
+SIZE = 3 ** 9
+
+# board_key weight of each cell (3 * i + j)
+WEIGHTS = 3 ** (8 - np.arange(9))
+
+# Score of a position won (by X) with no ply left
+WIN_SCORE = 10
+
+
+def all_boards():
+    """
+    Returns the (SIZE, 3, 3) int8 array of the boards of all the
+    keys (see tictactoe.boards_array), legal or not.
+    """
+    keys = np.arange(SIZE)
+    return (keys[:, None] // WEIGHTS % 3).astype(np.int8).reshape(-1, 3, 3)
+
+
+def solve():
+    """
+    Returns (scores, reachable) : int8 scores of every position
+    with legal mark counts, and a bool array marking the positions
+    reachable from the initial state, both indexed by board_key.
+    """
+    boards = all_boards()
+    flat = boards.reshape(-1, 9)
+    count_X = (flat == 1).sum(axis=1)
+    count_O = (flat == 2).sum(axis=1)
+    levels = count_X + count_O
+    legal = (count_X == count_O) | (count_X == count_O + 1)
+    winners = ttt.winner_batch(boards)
+    terminal = ttt.terminal_batch(boards, winners)
+    utilities = ttt.utility_batch(boards, winners)
+
+    # Best child score of each position so far, for the player to
+    # move : X on even levels, O on odd ones
+    best = np.where(levels % 2 == 0, -WIN_SCORE - 1, WIN_SCORE + 1)
+    best = best.astype(np.int8)
+    scores = np.zeros(SIZE, dtype=np.int8)
+    for level in range(9, -1, -1):
+        at_level = legal & (levels == level)
+        ended = at_level & terminal
+        scores[ended] = WIN_SCORE * utilities[ended]
+        ongoing = at_level & ~terminal
+        scores[ongoing] = best[ongoing]
+        if level == 0:
+            break
+
+        # Predecessors : take back the last move, made by mover
+        mover = 1 if level % 2 == 1 else 2
+        keys = np.flatnonzero(at_level)
+        # one more ply to the end of the game
+        child_scores = scores[keys] - np.sign(scores[keys])
+        parents, values = [], []
+        for c in range(9):
+            played = flat[keys, c] == mover
+            parents.append(keys[played] - mover * WEIGHTS[c])
+            values.append(child_scores[played])
+        parents = np.concatenate(parents)
+        values = np.concatenate(values).astype(np.int8)
+        if mover == 1:
+            np.maximum.at(best, parents, values)
+        else:
+            np.minimum.at(best, parents, values)
+
+    # Forward from the initial state, through positions not over
+    reachable = np.zeros(SIZE, dtype=bool)
+    reachable[0] = True
+    for level in range(9):
+        mover = 1 if level % 2 == 0 else 2
+        keys = np.flatnonzero(reachable & (levels == level) & ~terminal)
+        for c in range(9):
+            empty = flat[keys, c] == 0
+            reachable[keys[empty] + mover * WEIGHTS[c]] = True
+
+    return scores, reachable
+
+
+@lru_cache(maxsize=None)
+def default_solution():
+    """
+    Returns solve(), computed once per process.
+    """
+    return solve()
+
+
+def value(score):
+    """
+    Returns the minimax value (1, 0 or -1) of a score.
+    """
+    return int(np.sign(score))
+
+
+def plies(score):
+    """
+    Returns the number of plies left until the win of a won
+    position with perfect play, or None for a draw.
+    """
+    if score == 0:
+        return None
+    return WIN_SCORE - abs(int(score))
+
+
+def board_score(board, scores=None):
+    """
+    Returns the score of board.
+    """
+    if scores is None:
+        scores = default_solution()[0]
+    return int(scores[ttt.board_key(board)])
+
+
+def best_action(board, scores=None):
+    """
+    Returns the optimal action for the player to move on board,
+    winning as fast or losing as slowly as possible (ties broken
+    by the first cell in row-major order), or None if the board is
+    terminal.
+    """
+    if ttt.terminal(board):
+        return None
+    if scores is None:
+        scores = default_solution()[0]
+    mark = ttt.player(board)
+    key = ttt.board_key(board)
+    digit = 1 if mark == ttt.X else 2
+    sign = 1 if mark == ttt.X else -1
+    board_actions = sorted(ttt.actions(board))
+    return max(board_actions,
+               key=lambda action: sign * int(
+                   scores[key + digit * WEIGHTS[3 * action[0] + action[1]]]))
+
+
+def verify(scores, reachable):
+    """
+    Returns the list of the reachable boards whose score disagrees
+    with bitboard.minimax_value.
+    """
+    flat = all_boards().reshape(-1, 9)
+    mismatches = []
+    for key in np.flatnonzero(reachable):
+        x = sum(1 << c for c in range(9) if flat[key, c] == 1)
+        o = sum(1 << c for c in range(9) if flat[key, c] == 2)
+        if value(scores[key]) != bitboard.minimax_value(x, o):
+            mismatches.append(bitboard.to_board(x, o))
+    return mismatches
+
+
+def main():
+    print("Solving all positions...")
+    start = time.perf_counter()
+    scores, reachable = solve()
+    elapsed = time.perf_counter() - start
+    print(f"{reachable.sum()} reachable positions solved in {elapsed:.3f}s")
+    print("Checking against bitboard.minimax_value...")
+    mismatches = verify(scores, reachable)
+    if mismatches:
+        sys.exit(f"{len(mismatches)} positions differ.")
+    print(f"Initial state value : {value(scores[0])}")
+
+
+if __name__ == "__main__":
+    main()
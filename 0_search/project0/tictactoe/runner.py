@@ -1,8 +1,29 @@
+import argparse
 import pygame
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
+from mnk import MNKGame
+from parallel import RootSplitter
+
+parser = argparse.ArgumentParser(description="Play Tic-Tac-Toe.")
+parser.add_argument("--size", nargs=3, type=int, default=(3, 3, 3),
+                    metavar=("M", "N", "K"),
+                    help="M rows, N columns, K in a row to win (default: 3 3 3)")
+parser.add_argument("--time", type=float, default=1.0,
+                    help="seconds the computer may think per move "
+                         "(default: 1), beyond 3x3")
+parser.add_argument("--workers", type=int, default=1,
+                    help="processes searching the computer moves "
+                         "(default: 1)")
+args = parser.parse_args()
+m, n, k = args.size
+game = MNKGame(m, n, k)
+# Worker processes are started once, not for every move
+splitter = RootSplitter(args.workers) if args.workers > 1 else None
+# 3x3 is solved exactly by tictactoe.minimax, fastest wins first
+classic = (m, n, k) == (3, 3, 3)
 
 pygame.init()
 size = width, height = 600, 400
@@ -15,132 +36,151 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Board geometry
+tile_size = min(80, (height - 120) // m, (width - 40) // n)
+tile_origin = (width / 2 - (n / 2 * tile_size),
+               height / 2 - (m / 2 * tile_size))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
+
+# Buttons
+playXButton = pygame.Rect((width / 8), (height / 2), width / 4, 50)
+playOButton = pygame.Rect(5 * (width / 8), (height / 2), width / 4, 50)
+againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+
+# Board tiles
+tiles = [[pygame.Rect(tile_origin[0] + j * tile_size,
+                      tile_origin[1] + i * tile_size,
+                      tile_size, tile_size)
+          for j in range(n)]
+         for i in range(m)]
+
+
+def ai_move(board):
+    """
+    Returns the computer move on board. Runs in ai_executor, off the
+    event loop, so that the window keeps responding while the
+    computer thinks.
+    """
+    if classic:
+        return ttt.minimax(board, splitter=splitter)
+    return game.best_move(board, time_budget=args.time, splitter=splitter)
+
+
+def draw_button(button, text):
+    label = mediumFont.render(text, True, black)
+    labelRect = label.get_rect()
+    labelRect.center = button.center
+    pygame.draw.rect(screen, white, button)
+    screen.blit(label, labelRect)
+
+
+def draw_title(text, y):
+    title = largeFont.render(text, True, white)
+    titleRect = title.get_rect()
+    titleRect.center = ((width / 2), y)
+    screen.blit(title, titleRect)
+
+
+def draw_menu():
+    screen.fill(black)
+    draw_title("Play Tic-Tac-Toe", 50)
+    draw_button(playXButton, "Play as X")
+    draw_button(playOButton, "Play as O")
+
+
+def draw_board(board, title, game_over):
+    screen.fill(black)
+    for i in range(m):
+        for j in range(n):
+            rect = tiles[i][j]
+            pygame.draw.rect(screen, white, rect, 3)
+
+            if board[i][j] != ttt.EMPTY:
+                move = moveFont.render(board[i][j], True, white)
+                moveRect = move.get_rect()
+                moveRect.center = rect.center
+                screen.blit(move, moveRect)
+    draw_title(title, 30)
+    if game_over:
+        draw_button(againButton, "Play Again")
+
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = game.initial_state()
+
+# A single search at a time, polled on each frame
+ai_executor = ThreadPoolExecutor(max_workers=1)
+ai_future = None
+
+# What is on screen, redrawn only when it changes
+shown = None
+game_over = False
+player = None
+
+clock = pygame.time.Clock()
 
 while True:
 
+    click = None
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            ai_executor.shutdown(wait=False, cancel_futures=True)
             sys.exit()
-
-    screen.fill(black)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            click = event.pos
+        elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            shown = None
 
     # Let user choose a player.
     if user is None:
-
-        # Draw title
-        title = largeFont.render("Play Tic-Tac-Toe", True, white)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        # Draw buttons
-        playXButton = pygame.Rect((width / 8), (height / 2), width / 4, 50)
-        playX = mediumFont.render("Play as X", True, black)
-        playXRect = playX.get_rect()
-        playXRect.center = playXButton.center
-        pygame.draw.rect(screen, white, playXButton)
-        screen.blit(playX, playXRect)
-
-        playOButton = pygame.Rect(5 * (width / 8), (height / 2), width / 4, 50)
-        playO = mediumFont.render("Play as O", True, black)
-        playORect = playO.get_rect()
-        playORect.center = playOButton.center
-        pygame.draw.rect(screen, white, playOButton)
-        screen.blit(playO, playORect)
-
-        # Check if button is clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
-            if playXButton.collidepoint(mouse):
-                time.sleep(0.2)
+        if click is not None:
+            if playXButton.collidepoint(click):
                 user = ttt.X
-            elif playOButton.collidepoint(mouse):
-                time.sleep(0.2)
+            elif playOButton.collidepoint(click):
                 user = ttt.O
 
-    else:
-
-        # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
-        tiles = []
-        for i in range(3):
-            row = []
-            for j in range(3):
-                rect = pygame.Rect(
-                    tile_origin[0] + j * tile_size,
-                    tile_origin[1] + i * tile_size,
-                    tile_size, tile_size
-                )
-                pygame.draw.rect(screen, white, rect, 3)
-
-                if board[i][j] != ttt.EMPTY:
-                    move = moveFont.render(board[i][j], True, white)
-                    moveRect = move.get_rect()
-                    moveRect.center = rect.center
-                    screen.blit(move, moveRect)
-                row.append(rect)
-            tiles.append(row)
-
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
-
-        # Show title
-        if game_over:
-            winner = ttt.winner(board)
-            if winner is None:
-                title = f"Game Over: Tie."
-            else:
-                title = f"Game Over: {winner} wins."
-        elif user == player:
-            title = f"Play as {user}"
+    # Play Again
+    elif game_over:
+        if click is not None and againButton.collidepoint(click):
+            user = None
+            board = game.initial_state()
+
+    # Check for AI move
+    elif user != player:
+        if ai_future is None:
+            ai_future = ai_executor.submit(ai_move, board)
+        elif ai_future.done():
+            board = game.result(board, ai_future.result())
+            ai_future = None
+
+    # Check for a user move
+    elif click is not None:
+        for i in range(m):
+            for j in range(n):
+                if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(click)):
+                    board = game.result(board, (i, j))
+
+    if shown != (user, board):
+        if user is None:
+            draw_menu()
         else:
-            title = f"Computer thinking..."
-        title = largeFont.render(title, True, white)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 30)
-        screen.blit(title, titleRect)
-
-        # Check for AI move
-        if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
+            game_over = game.terminal(board)
+            player = game.player(board)
+
+            # Show title
+            if game_over:
+                winner = game.winner(board)
+                if not winner:
+                    title = f"Game Over: Tie."
+                else:
+                    title = f"Game Over: {winner} wins."
+            elif user == player:
+                title = f"Play as {user}"
             else:
-                ai_turn = True
-
-        # Check for a user move
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1 and user == player and not game_over:
-            mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
-                    if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
-                        board = ttt.result(board, (i, j))
-
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
-
-    pygame.display.flip()
+                title = f"Computer thinking..."
+            draw_board(board, title, game_over)
+        pygame.display.flip()
+        shown = (user, board)
+
+    clock.tick(30)
@@ -0,0 +1,178 @@
+"""
+Headless self-play of Tic Tac Toe.
+
+Plays games between two policies, without pygame, in a pool of
+worker processes, and reports the throughput of the players :
+
+    python selfplay.py --games 1000 --x minimax --o random --workers 4
+
+A policy is a function policy(board, rng) returning the action to
+play, where rng is a random.Random seeded per game so that runs are
+reproducible. See POLICIES for the available ones.
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+from functools import lru_cache
+
+import tictactoe as ttt
+import bitboard
+import lookup
+import retrograde
+
+
+def random_policy(board, rng):
+    return rng.choice(sorted(ttt.actions(board)))
+
+
+def minimax_policy(board, rng):
+    return ttt.minimax(board, use_table=False)
+
+
+def bitboard_policy(board, rng):
+    return bitboard.minimax(board)
+
+
+@lru_cache(maxsize=None)
+def table_entries():
+    """
+    Returns the lookup table, solved in memory if tictactoe.table
+    has not been written.
+    """
+    entries = lookup.default_table()
+    if entries is None:
+        entries = lookup.build_table()
+    return entries
+
+
+def table_policy(board, rng):
+    return lookup.best_action(board, table_entries())
+
+
+def retrograde_policy(board, rng):
+    return retrograde.best_action(board)
+
+
+POLICIES = {
+    "random": random_policy,
+    "minimax": minimax_policy,
+    "bitboard": bitboard_policy,
+    "table": table_policy,
+    "retrograde": retrograde_policy,
+}
+
+
+def play_game(x_policy, o_policy, seed):
+    """
+    Plays one game between the named policies.
+
+    Returns (winner, latencies, nodes) : X, O or 0 for a tie, the
+    seconds spent choosing each move, and the number of minimax
+    nodes searched.
+    """
+    policies = {ttt.X: POLICIES[x_policy], ttt.O: POLICIES[o_policy]}
+    rng = random.Random(seed)
+    board = ttt.initial_state()
+    latencies = []
+    nodes = ttt.search_stats["nodes"]
+    while not ttt.terminal(board):
+        policy = policies[ttt.player(board)]
+        start = time.perf_counter()
+        action = policy(board, rng)
+        latencies.append(time.perf_counter() - start)
+        board = ttt.result(board, action)
+    return ttt.winner(board), latencies, ttt.search_stats["nodes"] - nodes
+
+
+def play_game_args(args):
+    return play_game(*args)
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of sorted values (nearest rank).
+    """
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+def self_play(games, x_policy="minimax", o_policy="random", workers=1,
+              seed=0):
+    """
+    Plays games games between the named policies, in workers
+    processes, and returns a dict of statistics : the results,
+    games/sec over the wall-clock time, nodes/sec over the time
+    spent choosing moves (per process), and the p50/p90/p99
+    latencies of a move in seconds.
+    """
+    for name in (x_policy, o_policy):
+        if name not in POLICIES:
+            raise ValueError(f"unknown policy {name!r}")
+    tasks = [(x_policy, o_policy, seed + g) for g in range(games)]
+
+    start = time.perf_counter()
+    if workers > 1:
+        chunksize = max(1, games // (4 * workers))
+        with multiprocessing.Pool(workers) as pool:
+            results = list(pool.imap_unordered(play_game_args, tasks,
+                                               chunksize))
+    else:
+        results = [play_game_args(task) for task in tasks]
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, game_latencies, _ in results
+                       for latency in game_latencies)
+    thinking = sum(latencies)
+    nodes = sum(game_nodes for _, _, game_nodes in results)
+    winners = [winner for winner, _, _ in results]
+    return {
+        "games": games,
+        "x_wins": winners.count(ttt.X),
+        "o_wins": winners.count(ttt.O),
+        "ties": winners.count(0),
+        "moves": len(latencies),
+        "nodes": nodes,
+        "seconds": elapsed,
+        "games_per_sec": games / elapsed if elapsed else 0.0,
+        "nodes_per_sec": nodes / thinking if thinking else 0.0,
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Tic-Tac-Toe games between two policies, "
+                    "without a display.")
+    parser.add_argument("--games", type=int, default=100,
+                        help="number of games (default: 100)")
+    parser.add_argument("--x", default="minimax", choices=sorted(POLICIES),
+                        help="policy of X (default: minimax)")
+    parser.add_argument("--o", default="random", choices=sorted(POLICIES),
+                        help="policy of O (default: random)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes playing games (default: 1)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first game (default: 0)")
+    args = parser.parse_args()
+
+    stats = self_play(args.games, args.x, args.o, args.workers, args.seed)
+    print(f"{stats['games']} games, X {args.x} vs O {args.o} : "
+          f"X won {stats['x_wins']}, O won {stats['o_wins']}, "
+          f"{stats['ties']} ties")
+    print(f"Games/sec: {stats['games_per_sec']:.1f}")
+    print(f"Nodes/sec: {stats['nodes_per_sec']:.0f} "
+          f"({stats['nodes']} nodes)")
+    print(f"Move latency: p50 {1000 * stats['p50']:.3f} ms, "
+          f"p90 {1000 * stats['p90']:.3f} ms, "
+          f"p99 {1000 * stats['p99']:.3f} ms "
+          f"({stats['moves']} moves)")
+
+
+if __name__ == "__main__":
+    main()
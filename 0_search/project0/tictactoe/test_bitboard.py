@@ -0,0 +1,70 @@
+import unittest
+
+from tictactoe import X, O, EMPTY
+import tictactoe as ttt
+import bitboard
+
+
+class TestBitboard(unittest.TestCase):
+
+    boards = [
+        [[EMPTY, EMPTY, EMPTY],
+         [EMPTY, EMPTY, EMPTY],
+         [EMPTY, EMPTY, EMPTY]],
+        [[X, EMPTY, EMPTY],
+         [O, EMPTY, EMPTY],
+         [EMPTY, EMPTY, EMPTY]],
+        [[X, X, EMPTY],
+         [O, O, EMPTY],
+         [EMPTY, EMPTY, EMPTY]],
+        [[X, X, EMPTY],
+         [O, O, O],
+         [X, EMPTY, EMPTY]],
+        [[X, O, X],
+         [X, O, O],
+         [X, EMPTY, EMPTY]],
+        [[X, X, O],
+         [O, O, X],
+         [X, O, X]],
+        [[O, O, X],
+         [X, X, O],
+         [X, O, X]],
+    ]
+
+    def test_00_converters(self):
+        for board in self.boards:
+            self.assertEqual(bitboard.to_board(*bitboard.from_board(board)),
+                             board)
+        self.assertEqual(bitboard.from_board(self.boards[1]),
+                         (0b000000001, 0b000001000))
+
+    def test_10_rules(self):
+        for board in self.boards:
+            x, o = bitboard.from_board(board)
+            self.assertEqual(bitboard.winner(x, o), ttt.winner(board))
+            self.assertEqual(bitboard.terminal(x, o), ttt.terminal(board))
+            self.assertEqual(bitboard.utility(x, o), ttt.utility(board))
+            self.assertEqual({bitboard.action(c) for c in bitboard.actions(x, o)},
+                             ttt.actions(board))
+            if not ttt.terminal(board):
+                self.assertEqual(bitboard.player(x, o), ttt.player(board))
+
+    def test_20_move_undo(self):
+        x, o = bitboard.from_board(self.boards[1])
+        c = bitboard.cell((1, 1))
+        x2 = bitboard.move(x, c)
+        self.assertEqual(bitboard.to_board(x2, o),
+                         ttt.result(self.boards[1], (1, 1)))
+        self.assertEqual(bitboard.undo(x2, c), x)
+
+    def test_30_minimax(self):
+        for board in self.boards:
+            x, o = bitboard.from_board(board)
+            value = ttt.minimax_value(board)
+            self.assertEqual(bitboard.minimax_value(x, o), value)
+            move = bitboard.minimax(board)
+            if ttt.terminal(board):
+                self.assertIsNone(move)
+            else:
+                self.assertEqual(ttt.minimax_value(ttt.result(board, move)),
+                                 value)
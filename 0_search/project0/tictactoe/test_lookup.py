@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+from tictactoe import X, O, EMPTY
+import lookup
+
+
+class TestLookup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.entries = lookup.build_table()
+
+    def test_00_reachable_states(self):
+        self.assertEqual(len(lookup.reachable_states()), 5478)
+
+    def test_10_matches_minimax_value(self):
+        self.assertEqual(lookup.verify(self.entries), [])
+
+    def test_20_lookup(self):
+        board = [[X, X, EMPTY],
+                 [O, O, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertEqual(lookup.lookup(self.entries, board), (1, [(0, 2)]))
+        # O to play : must block, and then it is a draw
+        board = [[X, EMPTY, EMPTY],
+                 [EMPTY, O, EMPTY],
+                 [X, EMPTY, EMPTY]]
+        self.assertEqual(lookup.lookup(self.entries, board), (0, [(1, 0)]))
+        # unreachable : X has played twice in a row
+        board = [[X, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertIsNone(lookup.lookup(self.entries, board))
+        self.assertIsNone(lookup.best_action(board, self.entries))
+
+    def test_30_save_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "tictactoe.table")
+            self.assertIsNone(lookup.load_table(filename))
+            lookup.save_table(self.entries, filename)
+            self.assertEqual(lookup.load_table(filename), self.entries)
@@ -0,0 +1,53 @@
+import time
+import unittest
+
+from tictactoe import X, O, EMPTY
+import tictactoe as ttt
+from mnk import MNKGame
+
+
+class TestMNK(unittest.TestCase):
+
+    def test_00_winner(self):
+        game = MNKGame(4, 5, 4)
+        board = game.initial_state()
+        self.assertEqual(len(board), 4)
+        self.assertEqual(len(board[0]), 5)
+        for i in range(4):
+            board[i][4 - i] = O
+        self.assertEqual(game.winner(board), O)
+        board[0][4] = X
+        self.assertEqual(game.winner(board), 0)
+        self.assertFalse(game.terminal(board))
+
+    def test_10_classic(self):
+        # MNKGame(3, 3, 3) plays Tic Tac Toe perfectly when given time
+        game = MNKGame()
+        boards = [
+            [[X, X, EMPTY],
+             [O, O, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+            [[X, EMPTY, EMPTY],
+             [EMPTY, O, EMPTY],
+             [X, EMPTY, EMPTY]],
+            [[X, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+        ]
+        for board in boards:
+            self.assertEqual(game.winner(board), ttt.winner(board))
+            move = game.best_move(board, time_budget=10)
+            self.assertEqual(ttt.minimax_value(ttt.result(board, move)),
+                             ttt.minimax_value(board))
+
+    def test_20_time_budget(self):
+        game = MNKGame(7, 7, 5)
+        board = game.initial_state()
+        for _ in range(6):
+            start = time.monotonic()
+            move, _, depth, _ = game.search(board, time_budget=0.2)
+            # The search stops at SEARCH_SHARE of the budget : the
+            # margin only covers a busy machine
+            self.assertLess(time.monotonic() - start, 0.2 * 1.25)
+            self.assertGreaterEqual(depth, 1)
+            board = game.result(board, move)
@@ -0,0 +1,52 @@
+import unittest
+
+from tictactoe import X, O, EMPTY
+import tictactoe as ttt
+from mnk import MNKGame
+from parallel import RootSplitter, best_action
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_00_best_action(self):
+        scores = {(0, 0): 1, (1, 1): 3, (2, 2): 3}
+        self.assertEqual(best_action(scores, [(0, 0), (2, 2), (1, 1)]), (2, 2))
+        self.assertEqual(best_action(scores, [(1, 1), (2, 2)]), (1, 1))
+
+    def test_10_minimax(self):
+        # Same action as the serial search
+        boards = [
+            ttt.initial_state(),
+            [[X, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+            [[X, EMPTY, EMPTY],
+             [EMPTY, O, EMPTY],
+             [X, EMPTY, EMPTY]],
+            [[X, X, EMPTY],
+             [O, O, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+        ]
+        for board in boards:
+            self.assertEqual(ttt.minimax(board, use_table=False, workers=2),
+                             ttt.minimax(board, use_table=False))
+        # The same splitter for every move, with and without tables
+        with RootSplitter(2) as splitter:
+            for board in boards:
+                serial = ttt.minimax(board, use_table=False)
+                self.assertEqual(ttt.minimax(board, use_table=False,
+                                             splitter=splitter), serial)
+                self.assertEqual(ttt.minimax(board, cache=None,
+                                             use_table=False,
+                                             splitter=splitter), serial)
+
+    def test_20_mnk(self):
+        game = MNKGame(5, 5, 4)
+        board = game.initial_state()
+        for action in [(2, 2), (1, 1), (2, 1)]:
+            board = game.result(board, action)
+        serial = game.search(board, time_budget=60, max_depth=2)
+        with RootSplitter(2) as splitter:
+            split = game.search(board, time_budget=60, max_depth=2,
+                                splitter=splitter)
+        self.assertEqual(split[:3], serial[:3])
@@ -0,0 +1,67 @@
+import unittest
+
+from tictactoe import X, O, EMPTY
+import tictactoe as ttt
+import bitboard
+import lookup
+import retrograde
+
+
+class TestRetrograde(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scores, cls.reachable = retrograde.solve()
+
+    def test_00_reachable(self):
+        self.assertEqual(self.reachable.sum(), 5478)
+        for x, o in lookup.reachable_states():
+            self.assertTrue(self.reachable[lookup.key(x, o)])
+
+    def test_10_values(self):
+        self.assertEqual(retrograde.verify(self.scores, self.reachable), [])
+        self.assertEqual(retrograde.value(self.scores[0]), 0)
+        self.assertIsNone(retrograde.plies(self.scores[0]))
+
+    def test_20_fastest_win(self):
+        # X wins at once in (0, 2)
+        board = [[X, X, EMPTY],
+                 [O, O, EMPTY],
+                 [X, O, EMPTY]]
+        self.assertEqual(retrograde.board_score(board, self.scores), 9)
+        self.assertEqual(retrograde.plies(9), 1)
+        self.assertEqual(retrograde.best_action(board, self.scores), (0, 2))
+
+        # Along the best moves, a won game ends one ply sooner each move
+        for x, o in lookup.reachable_states():
+            board = bitboard.to_board(x, o)
+            score = retrograde.board_score(board, self.scores)
+            if ttt.terminal(board) or score == 0:
+                continue
+            action = retrograde.best_action(board, self.scores)
+            child = retrograde.board_score(ttt.result(board, action), self.scores)
+            self.assertEqual(retrograde.plies(child),
+                             retrograde.plies(score) - 1)
+
+    def test_30_minimax(self):
+        # X wins at once in (1, 1), which the search does not tell
+        # apart from the slower win in (2, 0)
+        board = [[EMPTY, X, O],
+                 [X, EMPTY, X],
+                 [EMPTY, O, O]]
+        self.assertEqual(ttt.minimax(board), (1, 1))
+        self.assertEqual(ttt.minimax(board, use_table=False), (2, 0))
+
+        for x, o in lookup.reachable_states():
+            board = bitboard.to_board(x, o)
+            action = ttt.minimax(board)
+            if ttt.terminal(board):
+                self.assertIsNone(action)
+                continue
+            self.assertEqual(action, retrograde.best_action(board, self.scores))
+
+        # Positions that can not be reached are searched
+        board = [[X, X, EMPTY],
+                 [X, EMPTY, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        self.assertEqual(ttt.minimax(board), ttt.minimax(board, use_table=False))
@@ -0,0 +1,33 @@
+import unittest
+
+from selfplay import percentile, play_game, self_play
+
+
+class TestSelfPlay(unittest.TestCase):
+
+    def test_00_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 90), 3)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_10_play_game(self):
+        # Same seed, same game
+        self.assertEqual(play_game("random", "random", 7)[0],
+                         play_game("random", "random", 7)[0])
+        winner, latencies, _ = play_game("table", "minimax", 0)
+        self.assertEqual(winner, 0)
+        self.assertEqual(len(latencies), 9)
+
+    def test_20_self_play(self):
+        # Perfect play never loses
+        stats = self_play(20, "minimax", "random", workers=2)
+        self.assertEqual(stats["games"], 20)
+        self.assertEqual(stats["o_wins"], 0)
+        self.assertEqual(stats["x_wins"] + stats["ties"], 20)
+        self.assertLessEqual(stats["p50"], stats["p90"])
+        self.assertLessEqual(stats["p90"], stats["p99"])
+        self.assertGreater(stats["games_per_sec"], 0)
+        with self.assertRaises(ValueError):
+            self_play(1, "minimax", "nobody")
@@ -2,6 +2,10 @@ import unittest
 
 from tictactoe import X, O, EMPTY
 from tictactoe import initial_state, player, actions, result, winner, terminal, utility, minimax_value, minimax_value_alpha_beta
+from tictactoe import minimax, TranspositionTable, EXACT, negamax_pvs, search_stats
+from tictactoe import transform_board, canonical_board, canonical_key, unique_actions
+from tictactoe import Position, board_key
+from tictactoe import boards_array, winner_batch, terminal_batch, utility_batch
 
 
 class TestTictactoe(unittest.TestCase):
@@ -179,6 +183,35 @@ class TestTictactoe(unittest.TestCase):
         self.assertEqual(winner(board_X),
                         X)
         
+    def test_45_winner_batch(self):
+        boards = [initial_state(),
+                  [[X, X, X],
+                   [O, O, EMPTY],
+                   [EMPTY, EMPTY, EMPTY]],
+                  [[X, X, EMPTY],
+                   [O, O, O],
+                   [X, EMPTY, EMPTY]],
+                  [[O, X, X],
+                   [X, O, EMPTY],
+                   [X, EMPTY, O]],
+                  [[X, X, O],
+                   [O, O, X],
+                   [X, O, X]],
+                  [[X, X, EMPTY],
+                   [O, O, EMPTY],
+                   [EMPTY, EMPTY, EMPTY]]]
+        array = boards_array(boards)
+        self.assertEqual(array.shape, (6, 3, 3))
+        # same as the scalar functions, X is 1 and O is 2
+        codes = {0: 0, 1: X, 2: O}
+        self.assertEqual([codes[code] for code in winner_batch(array)],
+                         [winner(board) for board in boards])
+        self.assertEqual(list(terminal_batch(array)),
+                         [terminal(board) for board in boards])
+        self.assertEqual(list(utility_batch(array)),
+                         [utility(board) for board in boards])
+        self.assertEqual(len(winner_batch(array[:0])), 0)
+
     def test_50_terminal(self):
         
         board_diag2 = [[O, O, X],
@@ -264,6 +297,192 @@ class TestTictactoe(unittest.TestCase):
              [X, X, O],
              [X, O, X]],
         ]
+        # Without tables, so that alpha-beta really searches instead of
+        # reading the value stored by minimax_value
         for board in boards:
-            self.assertEqual(minimax_value(board),
-                            minimax_value_alpha_beta(board, -2, 2))
\ No newline at end of file
+            self.assertEqual(minimax_value(board, cache=None),
+                            minimax_value_alpha_beta(board, -2, 2, cache=None))
+
+    def test_71_move_ordering(self):
+        # Number of positions searched without any cache, in board
+        # order, with move ordering, and with principal variation search
+        board = [[EMPTY, EMPTY, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        nodes = []
+        for search in (lambda: minimax_value_alpha_beta(board, -2, 2, None, ordered=False),
+                       lambda: minimax_value_alpha_beta(board, -2, 2, None),
+                       lambda: -negamax_pvs(board, -2, 2, None)):
+            search_stats["nodes"] = 0
+            self.assertEqual(search(), 0)
+            nodes.append(search_stats["nodes"])
+        self.assertLess(nodes[1], nodes[0])
+        self.assertLess(nodes[2], nodes[0])
+
+    def test_72_principal_variation_search(self):
+        boards = [
+            [[EMPTY, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+            [[X, X, O],
+             [O, O, X],
+             [X, O, X]],
+            [[X, X, EMPTY],
+             [O, O, O],
+             [X, EMPTY, EMPTY]],
+            [[X, X, EMPTY],
+             [O, O, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+            [[X, EMPTY, EMPTY],
+             [EMPTY, O, EMPTY],
+             [X, EMPTY, EMPTY]],
+            [[O, O, X],
+             [X, X, O],
+             [X, O, X]],
+        ]
+        for cache in (None, TranspositionTable()):
+            for board in boards:
+                sign = 1 if player(board) == X else -1
+                self.assertEqual(sign * negamax_pvs(board, -2, 2, cache),
+                                 minimax_value(board))
+                # sharing the table with minimax_value_alpha_beta
+                self.assertEqual(minimax_value_alpha_beta(board, -2, 2, cache),
+                                 minimax_value(board))
+
+    def test_73_cold_cache(self):
+        # A search starting from an empty table gives the value of an
+        # uncached one, and only cuts the search short once it is filled
+        boards = [
+            [[EMPTY, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+            [[X, EMPTY, EMPTY],
+             [EMPTY, O, EMPTY],
+             [X, EMPTY, EMPTY]],
+            [[X, X, EMPTY],
+             [O, O, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+        ]
+        for board in boards:
+            for search in (
+                    lambda cache: minimax_value(board, cache),
+                    lambda cache: minimax_value_alpha_beta(board, -2, 2, cache),
+                    lambda cache: negamax_pvs(board, -2, 2, cache)):
+                expected = search(None)
+                cache = TranspositionTable()
+                search_stats["nodes"] = 0
+                self.assertEqual(search(cache), expected)
+                self.assertGreater(search_stats["nodes"], 1)
+                self.assertGreater(len(cache), 0)
+                search_stats["nodes"] = 0
+                self.assertEqual(search(cache), expected)
+                self.assertEqual(search_stats["nodes"], 1)
+
+    def test_80_transposition_table(self):
+        # least recently used entries are evicted first
+        table = TranspositionTable(maxsize=2)
+        table.store(1, 0, EXACT)
+        table.store(2, 0, EXACT)
+        table.get(1)
+        table.store(3, 0, EXACT)
+        self.assertEqual(len(table), 2)
+        self.assertIsNone(table.get(2))
+        self.assertEqual(table.get(1), (0, EXACT, None))
+
+        # cached searches, even with a tiny table, give the same
+        # values as uncached ones
+        boards = [
+            [[EMPTY, EMPTY, EMPTY],
+             [EMPTY, X, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+            [[X, EMPTY, EMPTY],
+             [EMPTY, O, EMPTY],
+             [EMPTY, EMPTY, X]],
+            [[X, X, EMPTY],
+             [O, O, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+            [[X, O, X],
+             [EMPTY, O, EMPTY],
+             [EMPTY, EMPTY, EMPTY]],
+        ]
+        for cache in (TranspositionTable(), TranspositionTable(maxsize=10)):
+            for board in boards:
+                expected = minimax_value(board, cache=None)
+                self.assertEqual(minimax_value_alpha_beta(board, -2, 2, cache),
+                                 expected)
+                self.assertEqual(minimax_value(board, cache), expected)
+                self.assertEqual(minimax_value_alpha_beta(board, -2, 2, cache),
+                                 expected)
+                # narrow windows store bounds in the table
+                for alpha, beta in ((-2, 0), (0, 2), (-1, 1)):
+                    value = minimax_value_alpha_beta(board, alpha, beta, cache)
+                    if alpha < expected < beta:
+                        self.assertEqual(value, expected)
+                    elif expected <= alpha:
+                        self.assertLessEqual(value, alpha)
+                    else:
+                        self.assertGreaterEqual(value, beta)
+                self.assertEqual(minimax_value_alpha_beta(board, -2, 2, cache),
+                                 expected)
+                # and the best move keeps the minimax value
+                self.assertEqual(minimax_value(result(board, minimax(board, cache)),
+                                               cache=None),
+                                 expected)
+
+    def test_90_symmetry(self):
+        board = [[X, O, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, O]]
+        # all the symmetric forms share the canonical form
+        canonical, _ = canonical_board(board)
+        for symmetry in range(8):
+            transformed = transform_board(board, symmetry)
+            self.assertEqual(canonical_board(transformed)[0], canonical)
+            self.assertEqual(canonical_key(transformed), canonical_key(board))
+
+        # a corner, an edge and the center on the empty board
+        self.assertEqual(len(unique_actions(initial_state())), 3)
+        self.assertEqual(len(unique_actions(board)), len(actions(board)))
+
+        # the winning move is returned in the orientation of the board
+        board = [[X, X, EMPTY],
+                 [O, O, EMPTY],
+                 [EMPTY, EMPTY, EMPTY]]
+        for symmetry in range(8):
+            transformed = transform_board(board, symmetry)
+            move = minimax(transformed, use_table=False)
+            self.assertEqual(utility(result(transformed, move)), 1)
+
+    def test_95_make_undo_move(self):
+        board = [[X, O, EMPTY],
+                 [EMPTY, X, EMPTY],
+                 [EMPTY, EMPTY, O]]
+        position = Position(board)
+        self.assertEqual(position.mark, X)
+        self.assertEqual(position.empty, 5)
+        self.assertEqual(position.canonical()[0], canonical_key(board))
+
+        # the position follows result, in place
+        position.make_move((1, 0))
+        after = result(board, (1, 0))
+        self.assertEqual(position.board, after)
+        self.assertEqual(position.mark, O)
+        self.assertEqual(position.empty, 4)
+        self.assertEqual(position.keys[0], board_key(after))
+        self.assertEqual(position.canonical()[0], canonical_key(after))
+
+        # a win is seen, and undone
+        position.make_move((0, 2))
+        position.make_move((2, 0))
+        self.assertTrue(position.terminal())
+        self.assertEqual(position.utility(), 1)
+        for action in [(2, 0), (0, 2), (1, 0)]:
+            position.undo_move(action)
+        self.assertFalse(position.terminal())
+        self.assertEqual(position.board, board)
+        self.assertEqual(position.canonical()[0], canonical_key(board))
+
+        # the board passed is left untouched
+        self.assertEqual(board, [[X, O, EMPTY],
+                                 [EMPTY, X, EMPTY],
+                                 [EMPTY, EMPTY, O]])
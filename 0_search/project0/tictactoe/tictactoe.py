@@ -2,16 +2,74 @@
 Tic Tac Toe Player
 """
 
-import math, collections, operator
-from copy import deepcopy
+import math, operator
+from collections import OrderedDict
+from functools import partial
 
 import numpy as np
 
+import parallel
+
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Transposition table flags : the stored value is the exact minimax
+# value, or only a lower/upper bound of it after an alpha-beta cut-off
+EXACT = 0
+LOWERBOUND = 1
+UPPERBOUND = 2
+
+
+class TranspositionTable():
+    """
+    Bounded cache of searched positions, evicting the least
+    recently used entry when full.
+
+    Maps a board key (see canonical_key) to a (value, flag, move)
+    tuple, where move is the best action found on the canonical
+    board, or None.
+    """
+    def __init__(self, maxsize=2**16):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, value, flag, move=None):
+        self.entries[key] = (value, flag, move)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+# Shared by all searches of the process, so that a position searched
+# for one move is not searched again for the next ones
+transposition_table = TranspositionTable()
+
+# Number of positions visited by the searches, reset it to measure one
+search_stats = {"nodes": 0}
+
+# Rows, columns and diagonals, and the lines going through each cell
+LINES = (
+    ((0, 0), (0, 1), (0, 2)), ((1, 0), (1, 1), (1, 2)), ((2, 0), (2, 1), (2, 2)),
+    ((0, 0), (1, 0), (2, 0)), ((0, 1), (1, 1), (2, 1)), ((0, 2), (1, 2), (2, 2)),
+    ((0, 0), (1, 1), (2, 2)), ((0, 2), (1, 1), (2, 0)),
+)
+LINES_THROUGH = {(i, j): [line for line in LINES if (i, j) in line]
+                 for i in range(3) for j in range(3)}
+
 
 def initial_state():
     """
@@ -22,6 +80,145 @@ def initial_state():
             [EMPTY, EMPTY, EMPTY]]
 
 
+def board_key(board):
+    """
+    Returns the board encoded as an int in base 3, with one digit
+    per cell : 0 for EMPTY, 1 for X and 2 for O.
+    """
+    key = 0
+    for row in board:
+        for cell in row:
+            key = 3 * key + (0 if cell == EMPTY else 1 if cell == X else 2)
+    return key
+
+
+# The 8 symmetries of the board (rotations and reflections), as
+# functions mapping a cell (i, j) to its image
+SYMMETRIES = (
+    lambda i, j: (i, j),            # identity
+    lambda i, j: (j, 2 - i),        # rotation by 90 degrees
+    lambda i, j: (2 - i, 2 - j),    # rotation by 180 degrees
+    lambda i, j: (2 - j, i),        # rotation by 270 degrees
+    lambda i, j: (i, 2 - j),        # left-right reflection
+    lambda i, j: (2 - i, j),        # up-down reflection
+    lambda i, j: (j, i),            # main diagonal reflection
+    lambda i, j: (2 - j, 2 - i),    # anti-diagonal reflection
+)
+# Index of the inverse of each symmetry
+INVERSE_SYMMETRIES = (0, 3, 2, 1, 4, 5, 6, 7)
+
+# Weight in board_key of the image of cell (i, j) by each symmetry,
+# to update the keys of all the symmetric forms of a board in place
+KEY_WEIGHTS = {(i, j): tuple(3 ** (8 - 3 * a - b)
+                             for a, b in (f(i, j) for f in SYMMETRIES))
+               for i in range(3) for j in range(3)}
+
+
+def transform_action(action, symmetry):
+    """
+    Returns the image of action (i, j) by the symmetry of index symmetry.
+    """
+    return SYMMETRIES[symmetry](*action)
+
+
+def transform_board(board, symmetry):
+    """
+    Returns the image of board by the symmetry of index symmetry.
+    """
+    new_board = [[EMPTY, EMPTY, EMPTY] for _ in range(3)]
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            new_i, new_j = SYMMETRIES[symmetry](i, j)
+            new_board[new_i][new_j] = cell
+    return new_board
+
+
+def canonical_board(board):
+    """
+    Returns (canonical, symmetry) where canonical is the symmetric
+    form of board with the smallest board_key, and symmetry the
+    index of the symmetry mapping board to it.
+
+    Actions on canonical map back to board with
+    transform_action(action, INVERSE_SYMMETRIES[symmetry]).
+    """
+    boards = [transform_board(board, symmetry) for symmetry in range(8)]
+    symmetry = min(range(8), key=lambda symmetry: board_key(boards[symmetry]))
+    return boards[symmetry], symmetry
+
+
+def canonical_key(board):
+    """
+    Returns the board_key of the canonical form of board, shared by
+    all its symmetric forms since they have the same minimax value.
+    """
+    return board_key(canonical_board(board)[0])
+
+
+def unique_actions(board):
+    """
+    Returns the sorted list of actions of board, keeping only one
+    action among those leading to symmetric boards.
+    """
+    stabilizer = [symmetry for symmetry in range(1, 8)
+                  if transform_board(board, symmetry) == board]
+    return remove_symmetric(sorted(actions(board)), stabilizer)
+
+
+def remove_symmetric(board_actions, stabilizer):
+    """
+    Returns board_actions without the images of earlier ones by the
+    symmetries of stabilizer, which leave the board unchanged.
+    """
+    if not stabilizer:
+        return board_actions
+    unique = []
+    seen = set()
+    for action in board_actions:
+        if action in seen:
+            continue
+        unique.append(action)
+        seen.update(transform_action(action, symmetry)
+                    for symmetry in stabilizer)
+    return unique
+
+
+def completes_line(board, action, mark):
+    """
+    Returns True if playing mark on action would complete a line.
+    """
+    return any(all(board[i][j] == mark for i, j in line if (i, j) != action)
+               for line in LINES_THROUGH[action])
+
+
+def order_actions(board, board_actions, first=None, mark=None):
+    """
+    Returns board_actions sorted so that the most promising are
+    searched first : first (the best move of a previous search),
+    then winning moves, moves blocking a win of the opponent, the
+    center, the corners and the edges, for mark (by default the
+    player to move).
+    """
+    if mark is None:
+        mark = player(board)
+    other = O if mark == X else X
+
+    def rank(action):
+        if action == first:
+            return 0
+        if completes_line(board, action, mark):
+            return 1
+        if completes_line(board, action, other):
+            return 2
+        if action == (1, 1):
+            return 3
+        if action[0] != 1 and action[1] != 1:
+            return 4
+        return 5
+
+    return sorted(board_actions, key=lambda action: (rank(action), action))
+
+
 def player(board):
     """
     Returns player who has the next turn on a board.
@@ -36,14 +233,11 @@ def player(board):
     input (i.e., the game is already over).
 
     """
-    flat_board = [c for row in board for c in row]
-    counter = collections.Counter(flat_board)
-    if counter[None]== 0:
+    count_X = sum(row.count(X) for row in board)
+    count_O = sum(row.count(O) for row in board)
+    if count_X + count_O == 9:
         return "full board"
-    elif counter[None]==9:
-        return X
-    del counter[None]
-    return X if counter[X]<=counter[O] else O
+    return X if count_X<=count_O else O
 
 
 def actions(board):
@@ -92,14 +286,14 @@ def result(board, action):
     copy of the board first before making any changes.
     
     """
-    if action not in actions(board):
+    row, col = action
+    if not (0 <= row < 3 and 0 <= col < 3) or board[row][col] != EMPTY:
         raise ValueError("action passed ", action,
                          " is not in allowed actions ",
                          actions(board), " for ", board)
-    new_board = deepcopy(board)
-    player_XO = player(board)
-    row, col = action
-    new_board[row][col] = player_XO
+    # rows hold only strings and None, so copying them is enough
+    new_board = [list(board_row) for board_row in board]
+    new_board[row][col] = player(board)
     return new_board
 
 
@@ -124,15 +318,12 @@ def winner(board):
     the function should return None.
 
     """
-    import numpy as np
-    aboard = np.array(board)
-    
-    for X_or_O in (X, O):
-        col = np.any(np.sum(aboard==X_or_O, axis=0)==3)
-        li = np.any(np.sum(aboard==X_or_O, axis=1)==3)
-        diag = np.sum(np.diag(aboard==X_or_O))==3
-        diag_t = np.sum(np.diag(np.fliplr(aboard))==X_or_O)==3
-        if col or li or diag or diag_t:
+    # Plain Python : NumPy only pays off on many boards at once,
+    # see winner_batch
+    for (i1, j1), (i2, j2), (i3, j3) in LINES:
+        X_or_O = board[i1][j1]
+        if (X_or_O != EMPTY and board[i2][j2] == X_or_O
+                and board[i3][j3] == X_or_O):
             return X_or_O
     return 0
 
@@ -152,7 +343,7 @@ def terminal(board):
     game is still in progress.
 
     """
-    if winner(board) is not 0 or bool(actions(board)) == False:
+    if winner(board) != 0 or not any(EMPTY in row for row in board):
         return True
     return False
 
@@ -181,18 +372,166 @@ def utility(board):
         return 0
 
 
-def minimax_value(board):
+# Batches of boards are (N, 3, 3) int8 arrays of cell codes, the
+# digits of board_key : 0 for EMPTY, 1 for X and 2 for O
+CODES = {EMPTY: 0, X: 1, O: 2}
+
+# Flat cell indices (3 * i + j) of each line
+LINE_INDICES = np.array([[3 * i + j for i, j in line] for line in LINES])
+
+# utility of each winner code
+UTILITIES = np.array([0, 1, -1], dtype=np.int8)
+
+
+def boards_array(boards):
+    """
+    Returns the (N, 3, 3) int8 array of codes of a list of boards.
+    """
+    codes = [CODES[cell] for board in boards for row in board for cell in row]
+    return np.array(codes, dtype=np.int8).reshape(-1, 3, 3)
+
+
+def winner_batch(boards):
+    """
+    Returns the winner of each board of boards, an (N, 3, 3) int8
+    array of codes : an int8 array of N codes, 0 when nobody has
+    won. Like winner, assumes that at most one player has a line.
+    """
+    flat = np.asarray(boards, dtype=np.int8).reshape(-1, 9)
+    # (N, 8, 3) codes of the cells of each line
+    lines = flat[:, LINE_INDICES]
+    first = lines[:, :, 0]
+    complete = ((first != 0) & (lines[:, :, 1] == first)
+                & (lines[:, :, 2] == first))
+    return np.where(complete, first, 0).max(axis=1, initial=0).astype(np.int8)
+
+
+def terminal_batch(boards, winners=None):
+    """
+    Returns a bool array, True for the boards of boards (see
+    winner_batch) where the game is over. winners, the result of
+    winner_batch if already computed, is not computed again.
+    """
+    if winners is None:
+        winners = winner_batch(boards)
+    full = np.asarray(boards, dtype=np.int8).reshape(-1, 9).all(axis=1)
+    return (winners != 0) | full
+
+
+def utility_batch(boards, winners=None):
+    """
+    Returns an int8 array of the utility of each board of boards
+    (see winner_batch) : 1 if X has won, -1 if O has, 0 otherwise.
+    """
+    if winners is None:
+        winners = winner_batch(boards)
+    return UTILITIES[winners]
+
+
+class Position():
+    """
+    Board searched in place : make_move plays a move on it and
+    undo_move takes it back, without copying the board, while the
+    player to move, the number of empty cells, the winner and the
+    board_key of each symmetric form of the board are kept up to
+    date.
+
+    The search functions below take a board or a Position, and
+    wrap boards in a Position (a copy) once at the root.
+    """
+    def __init__(self, board):
+        self.board = [list(row) for row in board]
+        count_X = sum(row.count(X) for row in board)
+        count_O = sum(row.count(O) for row in board)
+        self.empty = 9 - count_X - count_O
+        self.mark = X if count_X <= count_O else O
+        self.winner = winner(self.board)
+        self.keys = [board_key(transform_board(self.board, symmetry))
+                     for symmetry in range(8)]
+
+    def make_move(self, action):
+        """
+        Plays action for the player to move. action must be empty
+        and the position not terminal.
+        """
+        i, j = action
+        mark = self.mark
+        self.board[i][j] = mark
+        digit = 1 if mark == X else 2
+        keys = self.keys
+        for symmetry, weight in enumerate(KEY_WEIGHTS[action]):
+            keys[symmetry] += digit * weight
+        self.empty -= 1
+        if completes_line(self.board, action, mark):
+            self.winner = mark
+        self.mark = O if mark == X else X
+
+    def undo_move(self, action):
+        """
+        Takes back action, the last move played.
+        """
+        i, j = action
+        mark = self.board[i][j]
+        self.board[i][j] = EMPTY
+        digit = 1 if mark == X else 2
+        keys = self.keys
+        for symmetry, weight in enumerate(KEY_WEIGHTS[action]):
+            keys[symmetry] -= digit * weight
+        self.empty += 1
+        self.winner = 0
+        self.mark = mark
+
+    def terminal(self):
+        return self.winner != 0 or self.empty == 0
+
+    def utility(self):
+        return 1 if self.winner == X else -1 if self.winner == O else 0
+
+    def canonical(self):
+        """
+        Returns (canonical_key, symmetry) like canonical_board,
+        from the keys kept up to date.
+        """
+        keys = self.keys
+        symmetry = min(range(8), key=keys.__getitem__)
+        return keys[symmetry], symmetry
+
+    def unique_actions(self):
+        """
+        Returns the same actions as unique_actions(board).
+        """
+        board = self.board
+        stabilizer = [symmetry for symmetry in range(1, 8)
+                      if self.keys[symmetry] == self.keys[0]]
+        board_actions = [(i, j) for i in range(3) for j in range(3)
+                         if board[i][j] == EMPTY]
+        return remove_symmetric(board_actions, stabilizer)
+
+
+def minimax_value(board, cache=transposition_table):
     """
     Return only the minimax value of the board.
     Not the action.
+
+    Values are looked up and stored in cache, a TranspositionTable
+    (None to disable it).
     """
-    if terminal(board):
-        return utility(board)
+    search_stats["nodes"] += 1
+    if not isinstance(board, Position):
+        board = Position(board)
+    if cache is not None:
+        key = board.canonical()[0]
+        entry = cache.get(key)
+        if entry is not None and entry[1] == EXACT:
+            return entry[0]
+
+    if board.terminal():
+        return board.utility()
 
     # initialize values
     init = 2
-    board_actions = actions(board)
-    player_X_or_O = player(board)
+    board_actions = board.unique_actions()
+    player_X_or_O = board.mark
     # set player functions
     if player_X_or_O==X:
         func = max
@@ -206,22 +545,59 @@ def minimax_value(board):
     # Computation of minimax value : 
     # for all actions, compute the minimax value...
     for action in board_actions:
-        next_board = result(board, action)
-        res = minimax_value(next_board)
+        board.make_move(action)
+        res = minimax_value(board, cache)
+        board.undo_move(action)
         # and update when a better solution is found
         # according to the min/max function
         v = func(v, res)
+    if cache is not None:
+        cache.store(key, v, EXACT)
     return v
 
 
-def minimax_value_alpha_beta(board, alpha, beta):
-    if terminal(board):
-        return utility(board)
+def minimax_value_alpha_beta(board, alpha, beta, cache=transposition_table,
+                             ordered=True):
+    """
+    Return the minimax value of the board, searching only
+    inside the (alpha, beta) window.
+
+    The value is exact when it is inside the window, otherwise
+    it is a bound of the minimax value. Values and bounds are
+    looked up and stored in cache, a TranspositionTable (None
+    to disable it).
+
+    With ordered=True, actions are searched in the order of
+    order_actions, starting with the best move stored in cache,
+    which prunes much more than searching them in board order.
+    """
+    search_stats["nodes"] += 1
+    if not isinstance(board, Position):
+        board = Position(board)
+    first = None
+    if cache is not None:
+        key, symmetry = board.canonical()
+        entry = cache.get(key)
+        if entry is not None:
+            value, flag, move = entry
+            if (flag == EXACT
+                    or (flag == LOWERBOUND and value >= beta)
+                    or (flag == UPPERBOUND and value <= alpha)):
+                return value
+            if move is not None:
+                first = transform_action(move, INVERSE_SYMMETRIES[symmetry])
+
+    if board.terminal():
+        return board.utility()
+    alpha_init, beta_init = alpha, beta
 
     # initialize values
     init = 2
-    board_actions = actions(board)
-    player_X_or_O = player(board)
+    board_actions = board.unique_actions()
+    player_X_or_O = board.mark
+    if ordered:
+        board_actions = order_actions(board.board, board_actions, first,
+                                      player_X_or_O)
     # set player functions
     if player_X_or_O==X:
         func = max
@@ -234,11 +610,15 @@ def minimax_value_alpha_beta(board, alpha, beta):
 
     # Computation of minimax value : 
     # for all actions, compute the minimax value...
+    best_action = None
     for action in board_actions:
-        next_board = result(board, action)
-        res = minimax_value_alpha_beta(next_board, alpha, beta)
+        board.make_move(action)
+        res = minimax_value_alpha_beta(board, alpha, beta, cache, ordered)
+        board.undo_move(action)
         # and update when a better solution is found
         # according to the min/max function
+        if func(v, res) != v:
+            best_action = action
         v = func(v, res)
         if player_X_or_O==X:
             alpha = func(alpha, res)
@@ -250,10 +630,104 @@ def minimax_value_alpha_beta(board, alpha, beta):
                 break
         else:
             raise ValueError("Player is", player_X_or_O)
+
+    # Outside of the initial window, v is only a bound
+    if cache is not None:
+        if v <= alpha_init:
+            flag = UPPERBOUND
+        elif v >= beta_init:
+            flag = LOWERBOUND
+        else:
+            flag = EXACT
+        cache.store(key, v, flag, transform_action(best_action, symmetry))
     return v
 
 
-def minimax(board):
+def negamax_pvs(board, alpha, beta, cache=transposition_table):
+    """
+    Principal variation search : returns the minimax value of the
+    board for the player to move (1 if they win), searching only
+    inside the (alpha, beta) window, like minimax_value_alpha_beta.
+
+    The first action in order_actions is searched with the full
+    window ; the others only with a null window proving that they
+    are not better, and are searched again if that proof fails.
+    Entries of cache keep the same convention (values for X) as
+    minimax_value_alpha_beta, so both can share a table.
+    """
+    search_stats["nodes"] += 1
+    if not isinstance(board, Position):
+        board = Position(board)
+    # +1 when X is to move, -1 when O is (also on a full board,
+    # where player() is not X)
+    sign = 1 if board.mark == X else -1
+
+    first = None
+    if cache is not None:
+        key, symmetry = board.canonical()
+        entry = cache.get(key)
+        if entry is not None:
+            value, flag, move = entry
+            value = sign * value
+            if sign < 0 and flag != EXACT:
+                flag = LOWERBOUND if flag == UPPERBOUND else UPPERBOUND
+            if (flag == EXACT
+                    or (flag == LOWERBOUND and value >= beta)
+                    or (flag == UPPERBOUND and value <= alpha)):
+                return value
+            if move is not None:
+                first = transform_action(move, INVERSE_SYMMETRIES[symmetry])
+
+    if board.terminal():
+        return sign * board.utility()
+    alpha_init = alpha
+
+    best_value = -2
+    best_action = None
+    board_actions = order_actions(board.board, board.unique_actions(), first,
+                                  board.mark)
+    for index, action in enumerate(board_actions):
+        board.make_move(action)
+        if index == 0:
+            value = -negamax_pvs(board, -beta, -alpha, cache)
+        else:
+            # values are integers, so (alpha, alpha + 1) is a null window
+            value = -negamax_pvs(board, -alpha - 1, -alpha, cache)
+            if alpha < value < beta:
+                value = -negamax_pvs(board, -beta, -value, cache)
+        board.undo_move(action)
+        if value > best_value:
+            best_value = value
+            best_action = action
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+
+    if cache is not None:
+        if best_value <= alpha_init:
+            flag = UPPERBOUND if sign > 0 else LOWERBOUND
+        elif best_value >= beta:
+            flag = LOWERBOUND if sign > 0 else UPPERBOUND
+        else:
+            flag = EXACT
+        cache.store(key, sign * best_value, flag,
+                    transform_action(best_action, symmetry))
+    return best_value
+
+
+def root_action_value(board, action, alpha, cache=transposition_table):
+    """
+    Returns the value of action on board for the player to move,
+    exact when above alpha, otherwise an upper bound at most alpha.
+    Evaluates the root actions of minimax in parallel.py.
+    """
+    position = Position(board)
+    position.make_move(action)
+    return -negamax_pvs(position, -2, -max(alpha, -2), cache)
+
+
+def minimax(board, cache=transposition_table, use_table=True, workers=1,
+            splitter=None):
     """
     Returns the optimal action for the current player on the board.
     
@@ -267,17 +741,52 @@ def minimax(board):
     If the board is a terminal board, the minimax function
     should return None.
 
+    With use_table=True, the move of a reachable position is read
+    from the scores of retrograde.py, solved once per process, so
+    that wins are as fast and losses as slow as possible. Otherwise
+    positions are searched, and cached in cache, a TranspositionTable
+    that by default persists across calls (None to disable it).
+
+    With a parallel.RootSplitter, the actions are searched in
+    parallel by its worker processes, each with its own table kept
+    across calls (or none with cache=None). workers > 1 does the
+    same with a temporary splitter of that many processes. Ties are
+    broken the same way, so the returned action is the same.
+
     """
+    if use_table:
+        # imported here since retrograde imports this module
+        import retrograde
+        scores, reachable = retrograde.default_solution()
+        if reachable[board_key(board)]:
+            return retrograde.best_action(board, scores)
+
     # If TERMINAL, no best move
     if terminal(board):
         return None
+    # Search the canonical form of the board, and map the best
+    # action back to the orientation of the board at the end
+    board, symmetry = canonical_board(board)
     # initialize values
     init = 2
-    board_actions = actions(board)
+    board_actions = unique_actions(board)
     player_X_or_O = player(board)
     alpha = -init
     beta = +init
 
+    if splitter is not None or workers > 1:
+        # the default table is the module one of each process
+        evaluate = root_action_value
+        if cache is not transposition_table:
+            evaluate = partial(root_action_value, cache=cache)
+        if splitter is not None:
+            scores = splitter.search(evaluate, board, board_actions)
+            best_action = parallel.best_action(scores, board_actions)
+        else:
+            best_action, _ = parallel.root_split(evaluate, board,
+                                                 board_actions, workers)
+        return transform_action(best_action, INVERSE_SYMMETRIES[symmetry])
+
     # we want to compute and update the best action from this point
     best_action = None
 
@@ -295,14 +804,16 @@ def minimax(board):
 
     # Computation of minimax best action : 
     # for all actions, compute the minimax value... 
+    position = Position(board)
     for action in board_actions:
         # Compute minimax value for next board
-        next_board = result(board, action)
-        res = minimax_value_alpha_beta(next_board, alpha, beta)
+        position.make_move(action)
+        res = minimax_value_alpha_beta(position, alpha, beta, cache)
+        position.undo_move(action)
         #res = minimax_value(next_board)
         # save the action if the score is the best so far
         if op(res, v):
             best_action = action
         # and update the best score so far
         v = func(v, res)
-    return best_action
+    return transform_action(best_action, INVERSE_SYMMETRIES[symmetry])
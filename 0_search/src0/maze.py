@@ -1,10 +1,46 @@
+import heapq
+import itertools
 import sys
+from collections import deque
+
+import numpy as np
+
+# Search algorithms of Maze.solve
+ALGORITHMS = ("dfs", "bfs", "greedy", "astar", "jps")
+
+# Colors of output_image, by color index
+PALETTE = np.array([
+    (237, 240, 252, 255),   # empty cell
+    (40, 40, 40, 255),      # wall
+    (255, 0, 0, 255),       # start
+    (0, 171, 28, 255),      # goal
+    (220, 235, 113, 255),   # solution
+    (212, 97, 85, 255),     # explored
+    (0, 0, 0, 255),         # border
+], dtype=np.uint8)
+(EMPTY_COLOR, WALL_COLOR, START_COLOR, GOAL_COLOR, SOLUTION_COLOR,
+ EXPLORED_COLOR, BORDER_COLOR) = range(len(PALETTE))
+
+# Largest width or height of output_image, in pixels, unless the
+# cell size is given
+MAX_IMAGE_SIZE = 4000
+
+# Actions, and the (row, column) step of each
+MOVES = (
+    ("up", -1, 0),
+    ("down", 1, 0),
+    ("left", 0, -1),
+    ("right", 0, 1),
+)
+
 
 class Node():
-    def __init__(self, state, parent, action):
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        # Number of steps from the start
+        self.cost = cost
 
 
 class StackFrontier():
@@ -39,98 +75,306 @@ class QueueFrontier(StackFrontier):
             self.frontier = self.frontier[1:]
             return node
 
+
+class IndexedStackFrontier():
+    """
+    Stack frontier backed by a deque, with a state -> node index.
+
+    add, remove, empty and contains_state are all O(1), where
+    StackFrontier scans the list for contains_state and copies
+    it on every remove.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.index = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.index[node.state] = node
+
+    def contains_state(self, state):
+        return state in self.index
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def _pop(self):
+        return self.frontier.pop()
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self._pop()
+            # only forget the state if no newer node was added for it
+            if self.index.get(node.state) is node:
+                del self.index[node.state]
+            return node
+
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def _pop(self):
+        return self.frontier.popleft()
+
+
+class PriorityFrontier():
+    """
+    Frontier backed by a binary heap, removing the node of lowest
+    priority(node) first (the oldest one among equals).
+
+    Adding a node for a state already in the frontier only replaces
+    it if it has a lower priority : the old heap entry is left in
+    place and skipped when it comes out.
+    """
+    def __init__(self, priority):
+        self.priority = priority
+        self.frontier = []
+        self.index = {}
+        self.counter = itertools.count()
+
+    def add(self, node):
+        priority = self.priority(node)
+        current = self.index.get(node.state)
+        if current is not None and self.priority(current) <= priority:
+            return
+        heapq.heappush(self.frontier, (priority, next(self.counter), node))
+        self.index[node.state] = node
+
+    def contains_state(self, state):
+        return state in self.index
+
+    def empty(self):
+        return len(self.index) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        while True:
+            _, _, node = heapq.heappop(self.frontier)
+            # skip nodes replaced by a better one
+            if self.index.get(node.state) is node:
+                del self.index[node.state]
+                return node
+
+
+def maze_lines(f):
+    """
+    Yields the lines of a maze file opened in binary mode, without
+    their line ending, with one byte per character : characters
+    outside of ASCII (only ever walls) become b"?".
+    """
+    for line in f:
+        line = line.rstrip(b"\r\n")
+        if not line.isascii():
+            line = line.decode().encode("ascii", "replace")
+        yield line
+
+
+def read_maze(filename):
+    """
+    Reads a maze file, one line at a time so that only the grid
+    is ever held in memory. The file is read twice : once to size
+    the grid and find A and B, then to fill it, which peaks lower
+    and runs faster than filling a grid that grows in one pass.
+
+    Returns (grid, start, goal) : a bool array of the walls padded
+    with a border of walls, so that neighbors never fall outside of
+    it, and the (i, j) cells of A and B. Cells past the end of a
+    short line are open.
+    """
+    # First pass : size of the maze, start and goal
+    height = width = 0
+    starts = []
+    goals = []
+    with open(filename, "rb") as f:
+        for i, line in enumerate(maze_lines(f)):
+            height += 1
+            width = max(width, len(line))
+            if b"A" in line:
+                starts.extend((i, j) for j, char in enumerate(line)
+                              if char == ord("A"))
+            if b"B" in line:
+                goals.extend((i, j) for j, char in enumerate(line)
+                             if char == ord("B"))
+
+    # Validate start and goal
+    if len(starts) != 1:
+        raise Exception("maze must have exactly one start point")
+    if len(goals) != 1:
+        raise Exception("maze must have exactly one goal")
+
+    # Second pass : walls, written straight into the grid
+    grid = np.zeros((height + 2, width + 2), dtype=bool)
+    grid[[0, -1], :] = True
+    grid[:, [0, -1]] = True
+    with open(filename, "rb") as f:
+        for i, line in enumerate(maze_lines(f)):
+            chars = np.frombuffer(line, dtype=np.uint8)
+            grid[i + 1, 1:len(line) + 1] = (
+                (chars != ord(" ")) & (chars != ord("A")) & (chars != ord("B")))
+    return grid, starts[0], goals[0]
+
+
 class Maze():
 
     def __init__(self, filename):
 
-        # Read file and set height and width of maze
-        with open(filename) as f:
-            contents = f.read()
-
-        # Validate start and goal
-        if contents.count("A") != 1:
-            raise Exception("maze must have exactly one start point")
-        if contents.count("B") != 1:
-            raise Exception("maze must have exactly one goal")
-
-        # Determine height and width of maze
-        contents = contents.splitlines()
-        self.height = len(contents)
-        self.width = max(len(line) for line in contents)
-
-        # Keep track of walls
-        self.walls = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                try:
-                    if contents[i][j] == "A":
-                        self.start = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == "B":
-                        self.goal = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == " ":
-                        row.append(False)
-                    else:
-                        row.append(True)
-                except IndexError:
-                    row.append(False)
-            self.walls.append(row)
+        # Read file, keeping track of walls
+        self.grid, self.start, self.goal = read_maze(filename)
+        self.height = self.grid.shape[0] - 2
+        self.width = self.grid.shape[1] - 2
+        # Walls only change through set_wall, which keeps the cells
+        # and the cached distance field in sync
+        self.grid.flags.writeable = False
+        self.walls = self.grid[1:-1, 1:-1]
+        self.init_cells()
 
         self.solution = None
+        self.visited = None
+        self.field = None
+
+
+    def init_cells(self):
+        """
+        Sets up the flat cell indices : cell (i, j) is index
+        (i + 1) * stride + j + 1 of the padded grid, its neighbors
+        are at fixed offsets, and open_cells[index] is 1 for the
+        cells that are not walls.
+        """
+        self.stride = self.width + 2
+        self.offsets = tuple((action, di * self.stride + dj)
+                             for action, di, dj in MOVES)
+        self.open_cells = bytearray((~self.grid).tobytes())
+
+
+    def set_wall(self, state, wall=True):
+        """
+        Puts a wall on cell (i, j), or removes it if wall is False.
+        The start and goal can not be walls.
+        """
+        i, j = state
+        if not (0 <= i < self.height and 0 <= j < self.width):
+            raise ValueError(f"cell {state} is outside of the maze")
+        if wall and state in (self.start, self.goal):
+            raise ValueError("the start and goal can not be walls")
+        self.grid.flags.writeable = True
+        self.grid[i + 1, j + 1] = wall
+        self.grid.flags.writeable = False
+        self.open_cells[self.cell_index(state)] = not wall
+        # distances to the goal may have changed
+        self.field = None
+
+
+    def cell_index(self, state):
+        """Flat index of cell (i, j)."""
+        return (state[0] + 1) * self.stride + state[1] + 1
+
+
+    def cell_state(self, index):
+        """Cell (i, j) of a flat index."""
+        i, j = divmod(index, self.stride)
+        return (i - 1, j - 1)
+
+
+    @property
+    def explored(self):
+        """Set of the cells explored by the last solve."""
+        if self.visited is None:
+            return set()
+        indices = np.flatnonzero(np.frombuffer(self.visited, dtype=np.uint8))
+        return {self.cell_state(int(index)) for index in indices}
+
+
+    def print(self, margin=None):
+        """
+        Prints the maze, and its solution if solved, in a single
+        write. With margin, only prints the cells within margin
+        cells of the solution (or of the start and goal if there
+        is none), for mazes too big for a terminal.
+        """
+        solution = self.solution[1] if self.solution is not None else None
 
+        # Code point of each cell, the first in this order wins :
+        # walls, start, goal, solution, empty
+        chars = np.full((self.height, self.width), ord(" "), dtype=np.uint32)
+        if solution:
+            rows, cols = zip(*solution)
+            chars[rows, cols] = ord("*")
+        chars[self.start] = ord("A")
+        chars[self.goal] = ord("B")
+        chars[self.walls] = ord("█")
 
-    def print(self):
-        solution = self.solution[1] if self.solution is not None else None
-        print()
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-                if col:
-                    print("█", end="")
-                elif (i, j) == self.start:
-                    print("A", end="")
-                elif (i, j) == self.goal:
-                    print("B", end="")
-                elif solution is not None and (i, j) in solution:
-                    print("*", end="")
-                else:
-                    print(" ", end="")
-            print()
-        print()
+        if margin is not None:
+            cells = [self.start, self.goal] + (solution or [])
+            rows = [i for i, _ in cells]
+            cols = [j for _, j in cells]
+            chars = chars[max(0, min(rows) - margin):max(rows) + margin + 1,
+                          max(0, min(cols) - margin):max(cols) + margin + 1]
+
+        # Each row of code points viewed as one string
+        lines = chars.view(f"<U{chars.shape[1]}").ravel() if chars.size else []
+        sys.stdout.write("\n" + "".join(line + "\n" for line in lines) + "\n")
 
 
     def neighbors(self, state):
         row, col = state
-        candidates = [
-            ("up", (row - 1, col)),
-            ("down", (row + 1, col)),
-            ("left", (row, col - 1)),
-            ("right", (row, col + 1))
-        ]
-
+        index = self.cell_index(state)
         result = []
-        for action, (r, c) in candidates:
-            if 0 <= r < self.height and 0 <= c < self.width and not self.walls[r][c]:
-                result.append((action, (r, c)))
+        for (action, di, dj), (_, offset) in zip(MOVES, self.offsets):
+            if self.open_cells[index + offset]:
+                result.append((action, (row + di, col + dj)))
         return result
 
 
-    def solve(self):
-        """Finds a solution to maze, if one exists."""
+    def solve(self, algorithm="dfs"):
+        """
+        Finds a solution to maze, if one exists, with one of
+        ALGORITHMS : depth-first or breadth-first search, greedy
+        best-first search (closest to the goal first), A* (lowest
+        steps from the start plus distance to the goal first, which
+        finds a shortest path), or A* over jump points only (see
+        jump_points), which finds a shortest path too.
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown algorithm {algorithm!r}, "
+                             f"expected one of {', '.join(ALGORITHMS)}")
 
         # Keep track of number of states explored
         self.num_explored = 0
 
+        # States are flat cell indices (see init_cells)
+        stride = self.stride
+        goal_row, goal_col = divmod(self.cell_index(self.goal), stride)
+
+        def distance(index):
+            row, col = divmod(index, stride)
+            return abs(row - goal_row) + abs(col - goal_col)
+
         # Initialize frontier to just the starting position
-        start = Node(state=self.start,
+        start = Node(state=self.cell_index(self.start),
                      parent=None,
                      action=None)
-        frontier = StackFrontier()
+        goal = self.cell_index(self.goal)
+        if algorithm == "dfs":
+            frontier = IndexedStackFrontier()
+        elif algorithm == "bfs":
+            frontier = IndexedQueueFrontier()
+        elif algorithm == "greedy":
+            frontier = PriorityFrontier(lambda node: distance(node.state))
+        else:
+            # among equals, closest to the goal first
+            frontier = PriorityFrontier(
+                lambda node: (node.cost + distance(node.state),
+                              distance(node.state)))
+        jumps = algorithm == "jps"
+        # A priority frontier keeps the best node of each state
+        replaces = isinstance(frontier, PriorityFrontier)
         frontier.add(start)
 
-        # Initialize an empty explored set
-        self.explored = set()
+        # Initialize an empty explored bitmap, one byte per cell
+        open_cells = self.open_cells
+        self.visited = visited = bytearray(len(open_cells))
 
         # Keep looping until solution found
         while True:
@@ -144,12 +388,16 @@ class Maze():
             self.num_explored += 1
 
             # If node is the goal, then we have a solution
-            if node.state == self.goal:
+            if node.state == goal:
                 actions = []
                 cells = []
                 while node.parent is not None:
-                    actions.append(node.action)
-                    cells.append(node.state)
+                    # fill in the cells skipped by a jump
+                    steps = node.cost - node.parent.cost
+                    offset = (node.state - node.parent.state) // steps
+                    for step in range(steps):
+                        actions.append(node.action)
+                        cells.append(self.cell_state(node.state - step * offset))
                     node = node.parent
                 actions.reverse()
                 cells.reverse()
@@ -157,75 +405,205 @@ class Maze():
                 return
 
             # Mark node as explored
-            self.explored.add(node.state)
-
-            # Add neighbors to frontier
-            for action, state in self.neighbors(node.state):
-                if not frontier.contains_state(state) and state not in self.explored:
-                    child = Node(state=state, parent=node, action=action)
+            visited[node.state] = 1
+
+            # Add neighbors to frontier, no bounds to check thanks
+            # to the border of walls
+            if jumps:
+                successors = self.jump_points(node, goal)
+            else:
+                successors = ((action, node.state + offset, 1)
+                              for action, offset in self.offsets)
+            for action, state, steps in successors:
+                if not open_cells[state] or visited[state]:
+                    continue
+                if replaces or not frontier.contains_state(state):
+                    child = Node(state=state, parent=node, action=action,
+                                 cost=node.cost + steps)
                     frontier.add(child)
 
 
-    def output_image(self, filename, show_solution=True, show_explored=False):
-        from PIL import Image, ImageDraw
-        cell_size = 50
-        cell_border = 2
-
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.width * cell_size, self.height * cell_size),
-            "black"
-        )
-        draw = ImageDraw.Draw(img)
-
-        solution = self.solution[1] if self.solution is not None else None
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-
-                # Walls
-                if col:
-                    fill = (40, 40, 40)
-
-                # Start
-                elif (i, j) == self.start:
-                    fill = (255, 0, 0)
-
-                # Goal
-                elif (i, j) == self.goal:
-                    fill = (0, 171, 28)
-
-                # Solution
-                elif solution is not None and show_solution and (i, j) in solution:
-                    fill = (220, 235, 113)
-
-                # Explored
-                elif solution is not None and show_explored and (i, j) in self.explored:
-                    fill = (212, 97, 85)
-
-                # Empty cell
-                else:
-                    fill = (237, 240, 252)
-
-                # Draw cell
-                draw.rectangle(
-                    ([(j * cell_size + cell_border, i * cell_size + cell_border),
-                      ((j + 1) * cell_size - cell_border, (i + 1) * cell_size - cell_border)]),
-                    fill=fill
-                )
-
-        img.save(filename)
-
-
-if len(sys.argv) != 2:
-    sys.exit("Usage: python maze.py maze.txt")
-
-m = Maze(sys.argv[1])
-print("Maze:")
-m.print()
-print("Solving...")
-m.solve()
-print("States Explored:", m.num_explored)
-print("Solution:")
-m.print()
-m.output_image("maze.png", show_explored=True)
+    def jump_points(self, node, goal):
+        """
+        Returns the (action, state, steps) successors of node for
+        Jump Point Search on the 4-connected grid.
+
+        Among the shortest paths between two cells, only those moving
+        horizontally first are searched : a horizontal move may turn
+        vertical anywhere, but a vertical move only turns horizontal
+        where the side cell is open while the side cell of the
+        previous step is a wall (a forced neighbor), since otherwise
+        the turn could have been taken earlier. Moves then go
+        straight to the next cell where a turn is needed, a jump
+        point, and only jump points are added to the frontier.
+        """
+        open_cells = self.open_cells
+        stride = self.stride
+        offsets = dict(self.offsets)
+
+        def jump_vertical(index, offset):
+            while True:
+                index += offset
+                if not open_cells[index]:
+                    return None
+                if index == goal:
+                    return index
+                if ((open_cells[index + 1] and not open_cells[index - offset + 1])
+                        or (open_cells[index - 1]
+                            and not open_cells[index - offset - 1])):
+                    return index
+
+        def jump_horizontal(index, offset):
+            while True:
+                index += offset
+                if not open_cells[index]:
+                    return None
+                if index == goal:
+                    return index
+                # turning vertical here leads to a jump point
+                if (jump_vertical(index, -stride) is not None
+                        or jump_vertical(index, stride) is not None):
+                    return index
+
+        index = node.state
+        if node.parent is None:
+            actions = [action for action, _ in self.offsets]
+        elif node.action in ("left", "right"):
+            actions = [node.action, "up", "down"]
+        else:
+            # keep going, or take the forced turns
+            back = index - offsets[node.action]
+            actions = [node.action] + [
+                action for action, side in (("left", -1), ("right", 1))
+                if open_cells[index + side] and not open_cells[back + side]]
+
+        successors = []
+        for action in actions:
+            offset = offsets[action]
+            if action in ("left", "right"):
+                jump_point = jump_horizontal(index, offset)
+            else:
+                jump_point = jump_vertical(index, offset)
+            if jump_point is not None:
+                successors.append(
+                    (action, jump_point, (jump_point - index) // offset))
+        return successors
+
+
+    def distance_field(self):
+        """
+        Returns the number of steps from each cell to the goal, as a
+        flat int32 array over the padded grid (see init_cells), -1
+        for walls and cells that can not reach the goal.
+
+        Computed by one breadth-first search from the goal, a whole
+        layer of cells at a time with NumPy, then cached until the
+        walls change.
+        """
+        if self.field is not None:
+            return self.field
+
+        open_cells = np.frombuffer(self.open_cells, dtype=bool)
+        offsets = np.array([offset for _, offset in self.offsets])
+        field = np.full(len(open_cells), -1, dtype=np.int32)
+        layer = np.array([self.cell_index(self.goal)])
+        field[layer] = 0
+        distance = 0
+        while len(layer):
+            distance += 1
+            # open cells next to the layer not reached yet, no
+            # bounds to check thanks to the border of walls
+            cells = np.unique((layer[:, None] + offsets).ravel())
+            layer = cells[open_cells[cells] & (field[cells] < 0)]
+            field[layer] = distance
+
+        self.field = field
+        return field
+
+
+    def path_from(self, start):
+        """
+        Returns a shortest path from cell start to the goal, as an
+        (actions, cells) tuple like solution, by walking down the
+        distance field : O(path length) once the field is computed.
+        Unlike solve, leaves solution and explored unchanged.
+        """
+        if not (0 <= start[0] < self.height and 0 <= start[1] < self.width):
+            raise ValueError(f"cell {start} is outside of the maze")
+        field = self.distance_field()
+        index = self.cell_index(start)
+        if field[index] < 0:
+            raise Exception("no solution")
+
+        actions = []
+        cells = []
+        distance = field[index]
+        while distance > 0:
+            for action, offset in self.offsets:
+                if field[index + offset] == distance - 1:
+                    break
+            index += offset
+            distance -= 1
+            actions.append(action)
+            cells.append(self.cell_state(index))
+        return actions, cells
+
+
+    def output_image(self, filename, show_solution=True, show_explored=False,
+                     cell_size=None):
+        """
+        Draws the maze to filename, with cells of cell_size pixels
+        (by default 50, less for big mazes so that the image stays
+        within MAX_IMAGE_SIZE pixels).
+
+        Cells are first given a color index, which is upscaled once
+        with np.repeat and mapped through PALETTE, instead of drawing
+        each cell.
+        """
+        from PIL import Image
+        if cell_size is None:
+            cell_size = max(1, min(50, MAX_IMAGE_SIZE // max(self.height,
+                                                               self.width)))
+        # Black lines between cells, as long as cells are big enough
+        cell_border = 2 if cell_size >= 10 else 1 if cell_size >= 4 else 0
+
+        # Color index of each cell, the first in this order wins :
+        # walls, start, goal, solution, explored, empty
+        cells = np.full((self.height, self.width), EMPTY_COLOR, dtype=np.uint8)
+        if self.solution is not None:
+            if show_explored and self.visited is not None:
+                visited = np.frombuffer(self.visited, dtype=np.uint8)
+                explored = visited.reshape(self.grid.shape)[1:-1, 1:-1]
+                cells[explored != 0] = EXPLORED_COLOR
+            if show_solution and self.solution[1]:
+                rows, cols = zip(*self.solution[1])
+                cells[rows, cols] = SOLUTION_COLOR
+        cells[self.start] = START_COLOR
+        cells[self.goal] = GOAL_COLOR
+        cells[self.walls] = WALL_COLOR
+
+        # Upscale, then paint the borders of the cells
+        pixels = np.repeat(np.repeat(cells, cell_size, axis=0),
+                           cell_size, axis=1)
+        offsets = np.arange(cell_size)
+        border = (offsets < cell_border) | (offsets > cell_size - cell_border)
+        pixels[np.tile(border, self.height), :] = BORDER_COLOR
+        pixels[:, np.tile(border, self.width)] = BORDER_COLOR
+
+        Image.fromarray(PALETTE[pixels], "RGBA").save(filename)
+
+
+if __name__ == "__main__":
+    algorithm = sys.argv[2] if len(sys.argv) == 3 else "dfs"
+    if len(sys.argv) not in (2, 3) or algorithm not in ALGORITHMS:
+        sys.exit(f"Usage: python maze.py maze.txt [{'|'.join(ALGORITHMS)}]")
+
+    m = Maze(sys.argv[1])
+    print("Maze:")
+    m.print()
+    print("Solving...")
+    m.solve(algorithm)
+    print("States Explored:", m.num_explored)
+    print("Solution:")
+    m.print()
+    m.output_image("maze.png", show_explored=True)
@@ -0,0 +1,416 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+from collections import deque
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import maze as maze_module
+from maze import Maze
+
+
+MOVES = {"up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1)}
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def random_mazes(seed, count, max_size=20):
+    """
+    Yields the text of count random mazes, of random size and wall
+    density, with the start and goal on random cells.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        height = rng.randint(2, max_size)
+        width = rng.randint(2, max_size)
+        density = rng.choice([0.1, 0.2, 0.3, 0.4, 0.5])
+        rows = [["#" if rng.random() < density else " "
+                 for _ in range(width)] for _ in range(height)]
+        cells = [(i, j) for i in range(height) for j in range(width)]
+        (si, sj), (gi, gj) = rng.sample(cells, 2)
+        rows[si][sj] = "A"
+        rows[gi][gj] = "B"
+        yield "\n".join("".join(row) for row in rows)
+
+
+class MazeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self, text):
+        """
+        Returns the Maze of text, written as is when it is bytes.
+        """
+        filename = os.path.join(self.tmp.name, "maze.txt")
+        if isinstance(text, str):
+            text = text.encode()
+        with open(filename, "wb") as f:
+            f.write(text)
+        return Maze(filename)
+
+    def solution_length(self, maze, algorithm):
+        """
+        Returns the number of steps of the solution found by
+        algorithm, checked to be a valid path, or None.
+        """
+        try:
+            maze.solve(algorithm)
+        except Exception as e:
+            self.assertEqual(str(e), "no solution")
+            return None
+        self.assertValidPath(maze, maze.start, maze.solution)
+        return len(maze.solution[1])
+
+    def assertValidPath(self, maze, start, solution):
+        actions, cells = solution
+        self.assertEqual(len(actions), len(cells))
+        cell = start
+        for action, next_cell in zip(actions, cells):
+            di, dj = MOVES[action]
+            cell = (cell[0] + di, cell[1] + dj)
+            self.assertEqual(cell, next_cell)
+            self.assertFalse(maze.walls[cell])
+        self.assertEqual(cell, maze.goal)
+
+
+def goal_distances(maze):
+    """
+    Returns a dict mapping each cell that can reach the goal to its
+    number of steps to the goal, by a plain breadth-first search.
+    """
+    distances = {maze.goal: 0}
+    queue = deque([maze.goal])
+    while queue:
+        i, j = queue.popleft()
+        for di, dj in MOVES.values():
+            cell = (i + di, j + dj)
+            if (0 <= cell[0] < maze.height and 0 <= cell[1] < maze.width
+                    and not maze.walls[cell] and cell not in distances):
+                distances[cell] = distances[(i, j)] + 1
+                queue.append(cell)
+    return distances
+
+
+class TestReadMaze(MazeTestCase):
+
+    def test_00_walls(self):
+        maze = self.load("#A #\n# B#\n####")
+        self.assertEqual((maze.height, maze.width), (3, 4))
+        self.assertEqual((maze.start, maze.goal), ((0, 1), (1, 2)))
+        self.assertEqual(maze.walls.tolist(),
+                         [[True, False, False, True],
+                          [True, False, False, True],
+                          [True, True, True, True]])
+        # padded with a border of walls
+        self.assertTrue(maze.grid[[0, -1], :].all())
+        self.assertTrue(maze.grid[:, [0, -1]].all())
+
+    def test_10_short_rows(self):
+        # Cells past the end of a short line are open
+        maze = self.load("A\n###\n#\n  B\n")
+        self.assertEqual((maze.height, maze.width), (4, 3))
+        self.assertEqual(maze.walls.tolist(),
+                         [[False, False, False],
+                          [True, True, True],
+                          [True, False, False],
+                          [False, False, False]])
+        self.assertEqual(maze.goal, (3, 2))
+
+    def test_20_line_endings(self):
+        text = "#A #\n# B#\n####"
+        expected = self.load(text).walls.tolist()
+        for ending in (b"\r\n", b"\n"):
+            data = text.encode().replace(b"\n", ending)
+            for data in (data, data + ending):
+                with self.subTest(data=data):
+                    maze = self.load(data)
+                    self.assertEqual(maze.walls.tolist(), expected)
+                    self.assertEqual((maze.start, maze.goal),
+                                     ((0, 1), (1, 2)))
+
+    def test_30_non_ascii_walls(self):
+        # Each character is one cell, whatever its utf-8 length
+        maze = self.load("█A █\n█ B█\n████")
+        self.assertEqual(maze.walls.tolist(),
+                         self.load("#A #\n# B#\n####").walls.tolist())
+        self.assertEqual((maze.start, maze.goal), ((0, 1), (1, 2)))
+        maze = self.load("é€A\n😀 B")
+        self.assertEqual((maze.height, maze.width), (2, 3))
+        self.assertEqual((maze.start, maze.goal), ((0, 2), (1, 2)))
+        self.assertEqual(maze.walls.tolist(),
+                         [[True, True, False], [True, False, False]])
+
+    def test_40_start_and_goal(self):
+        for text, message in (
+                ("A  \n  B\nA  ", "maze must have exactly one start point"),
+                ("AA\nB ", "maze must have exactly one start point"),
+                ("   \n  B", "maze must have exactly one start point"),
+                ("A B\n  B", "maze must have exactly one goal"),
+                ("A  \n   ", "maze must have exactly one goal"),
+                ("", "maze must have exactly one start point")):
+            with self.subTest(text=text):
+                with self.assertRaises(Exception) as raised:
+                    self.load(text)
+                self.assertEqual(str(raised.exception), message)
+
+
+class TestSolve(MazeTestCase):
+
+    def test_00_sample_mazes(self):
+        for name in ("maze1.txt", "maze2.txt", "maze3.txt"):
+            with open(os.path.join(DIRECTORY, name)) as f:
+                text = f.read()
+            lengths = {algorithm: self.solution_length(self.load(text),
+                                                       algorithm)
+                       for algorithm in ("bfs", "astar", "jps")}
+            with self.subTest(maze=name):
+                self.assertEqual(lengths["astar"], lengths["bfs"])
+                self.assertEqual(lengths["jps"], lengths["bfs"])
+
+    def test_10_shortest_paths(self):
+        # A* and jump point search find paths as short as BFS
+        for text in random_mazes(seed=0, count=300):
+            expected = self.solution_length(self.load(text), "bfs")
+            for algorithm in ("astar", "jps"):
+                with self.subTest(maze=text, algorithm=algorithm):
+                    self.assertEqual(
+                        self.solution_length(self.load(text), algorithm),
+                        expected)
+
+    def test_20_any_paths(self):
+        # Greedy best-first and depth-first search find a valid path,
+        # maybe longer, whenever BFS finds one
+        for text in random_mazes(seed=4, count=300):
+            expected = self.solution_length(self.load(text), "bfs")
+            for algorithm in ("greedy", "dfs"):
+                with self.subTest(maze=text, algorithm=algorithm):
+                    length = self.solution_length(self.load(text), algorithm)
+                    if expected is None:
+                        self.assertIsNone(length)
+                    else:
+                        self.assertGreaterEqual(length, expected)
+
+    def test_30_greedy(self):
+        # Heads for the goal : straight there on an open grid, where
+        # BFS explores every cell closer to the start than the goal
+        text = "A" + " " * 18 + "\n" + (" " * 19 + "\n") * 8 + " " * 18 + "B"
+        greedy = self.load(text)
+        greedy.solve("greedy")
+        self.assertEqual(len(greedy.solution[1]), 27)
+        self.assertEqual(greedy.num_explored, 28)
+        bfs = self.load(text)
+        bfs.solve("bfs")
+        self.assertGreater(bfs.num_explored, greedy.num_explored)
+
+
+class TestPathFrom(MazeTestCase):
+
+    def assertShortestPaths(self, maze):
+        distances = goal_distances(maze)
+        for i in range(maze.height):
+            for j in range(maze.width):
+                start = (i, j)
+                with self.subTest(start=start):
+                    if start not in distances:
+                        with self.assertRaises(Exception):
+                            maze.path_from(start)
+                        continue
+                    solution = maze.path_from(start)
+                    self.assertValidPath(maze, start, solution)
+                    self.assertEqual(len(solution[1]), distances[start])
+
+    def test_00_shortest_paths(self):
+        for text in random_mazes(seed=1, count=50, max_size=12):
+            maze = self.load(text)
+            self.assertShortestPaths(maze)
+
+    def test_10_set_wall(self):
+        # Changing the walls invalidates the cached distance field
+        rng = random.Random(2)
+        for text in random_mazes(seed=3, count=50, max_size=12):
+            maze = self.load(text)
+            maze.distance_field()
+            cells = [(i, j) for i in range(maze.height)
+                     for j in range(maze.width)
+                     if (i, j) not in (maze.start, maze.goal)]
+            for cell in rng.sample(cells, min(3, len(cells))):
+                wall = not maze.walls[cell]
+                maze.set_wall(cell, wall)
+                self.assertIsNone(maze.field)
+                self.assertEqual(maze.walls[cell], wall)
+                self.assertShortestPaths(maze)
+
+    def test_20_outside(self):
+        maze = self.load("A #\n  B")
+        with self.assertRaises(ValueError):
+            maze.path_from((2, 0))
+        with self.assertRaises(ValueError):
+            maze.set_wall(maze.goal)
+
+
+def reference_image(maze, cell_size, cell_border, show_solution=True,
+                    show_explored=False):
+    """
+    Returns the image of maze drawn one rectangle per cell with
+    ImageDraw, as output_image used to.
+    """
+    img = Image.new("RGBA", (maze.width * cell_size,
+                             maze.height * cell_size), "black")
+    draw = ImageDraw.Draw(img)
+    solution = maze.solution[1] if maze.solution is not None else None
+    explored = maze.explored
+    for i, row in enumerate(maze.walls):
+        for j, wall in enumerate(row):
+            if wall:
+                fill = (40, 40, 40)
+            elif (i, j) == maze.start:
+                fill = (255, 0, 0)
+            elif (i, j) == maze.goal:
+                fill = (0, 171, 28)
+            elif solution is not None and show_solution and (i, j) in solution:
+                fill = (220, 235, 113)
+            elif solution is not None and show_explored and (i, j) in explored:
+                fill = (212, 97, 85)
+            else:
+                fill = (237, 240, 252)
+            draw.rectangle([(j * cell_size + cell_border,
+                             i * cell_size + cell_border),
+                            ((j + 1) * cell_size - cell_border,
+                             (i + 1) * cell_size - cell_border)],
+                           fill=fill)
+    return np.asarray(img)
+
+
+class TestOutputImage(MazeTestCase):
+
+    def draw(self, maze, **kwargs):
+        filename = os.path.join(self.tmp.name, "maze.png")
+        maze.output_image(filename, **kwargs)
+        with Image.open(filename) as img:
+            self.assertEqual(img.mode, "RGBA")
+            return np.asarray(img)
+
+    def test_00_sample_mazes(self):
+        for name in ("maze1.txt", "maze2.txt", "maze3.txt"):
+            maze = Maze(os.path.join(DIRECTORY, name))
+            with self.subTest(maze=name, solved=False):
+                pixels = self.draw(maze)
+                self.assertEqual(pixels.shape,
+                                 (maze.height * 50, maze.width * 50, 4))
+                np.testing.assert_array_equal(pixels,
+                                              reference_image(maze, 50, 2))
+            maze.solve("bfs")
+            for show_solution in (True, False):
+                for show_explored in (True, False):
+                    with self.subTest(maze=name, show_solution=show_solution,
+                                      show_explored=show_explored):
+                        pixels = self.draw(maze, show_solution=show_solution,
+                                           show_explored=show_explored)
+                        np.testing.assert_array_equal(
+                            pixels,
+                            reference_image(maze, 50, 2, show_solution,
+                                            show_explored))
+
+    def test_10_palette(self):
+        maze = Maze(os.path.join(DIRECTORY, "maze1.txt"))
+        maze.solve("dfs")
+        pixels = self.draw(maze, show_explored=True)
+        colors = {tuple(color) for color in pixels.reshape(-1, 4)}
+        self.assertLessEqual(colors, {tuple(color)
+                                      for color in maze_module.PALETTE})
+        # Cells are drawn from pixel 2 to 48 of each 50, on black
+        black = (0, 0, 0, 255)
+        for offset, color in ((0, black), (1, black), (2, (255, 0, 0, 255)),
+                              (48, (255, 0, 0, 255)), (49, black)):
+            i, j = maze.start
+            self.assertEqual(tuple(pixels[i * 50 + 25, j * 50 + offset]),
+                             color)
+            self.assertEqual(tuple(pixels[i * 50 + offset, j * 50 + 25]),
+                             color)
+
+    def test_20_big_maze(self):
+        # Cells shrink so that the image stays within MAX_IMAGE_SIZE,
+        # down to one pixel
+        for width, cell_size, cell_border in ((100, 40, 2), (500, 8, 1),
+                                              (2000, 2, 0), (5000, 1, 0)):
+            with self.subTest(width=width):
+                maze = self.load("A" + " " * (width - 2) + "B\n"
+                                 + "# " * (width // 2))
+                pixels = self.draw(maze)
+                self.assertEqual(pixels.shape,
+                                 (2 * cell_size, width * cell_size, 4))
+                if cell_size > 1:
+                    self.assertLessEqual(max(pixels.shape),
+                                         maze_module.MAX_IMAGE_SIZE)
+                np.testing.assert_array_equal(
+                    pixels, reference_image(maze, cell_size, cell_border))
+        # unless the cell size is given
+        pixels = self.draw(maze, cell_size=3)
+        self.assertEqual(pixels.shape, (6, 15000, 4))
+
+
+class TestPrint(MazeTestCase):
+
+    def output(self, maze, **kwargs):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            maze.print(**kwargs)
+        return out.getvalue()
+
+    def test_00_solved(self):
+        maze = Maze(os.path.join(DIRECTORY, "maze1.txt"))
+        self.assertEqual(self.output(maze),
+                         "\n"
+                         "█████B█\n"
+                         "█████ █\n"
+                         "████  █\n"
+                         "████ ██\n"
+                         "     ██\n"
+                         "A██████\n"
+                         "\n")
+        maze.solve("bfs")
+        self.assertEqual(self.output(maze),
+                         "\n"
+                         "█████B█\n"
+                         "█████*█\n"
+                         "████**█\n"
+                         "████*██\n"
+                         "*****██\n"
+                         "A██████\n"
+                         "\n")
+
+    def test_10_margin(self):
+        maze = self.load("A         \n"
+                         " ######## \n"
+                         "   ##     \n"
+                         "  B#      \n")
+        self.assertEqual(self.output(maze, margin=0),
+                         "\nA  \n ██\n   \n  B\n\n")
+        maze.solve("bfs")
+        full = self.output(maze).split("\n")
+        self.assertEqual(full[1:5], ["A         ",
+                                     "*████████ ",
+                                     "*  ██     ",
+                                     "**B█      "])
+        # only the cells within margin of the solution
+        for margin in range(5):
+            with self.subTest(margin=margin):
+                width = min(3 + margin, maze.width)
+                expected = [line[:width] for line in full[1:5]]
+                self.assertEqual(self.output(maze, margin=margin),
+                                 "\n" + "".join(line + "\n"
+                                                for line in expected) + "\n")
+        # and nothing past the edges
+        self.assertEqual(self.output(maze, margin=100), self.output(maze))
+
+
+if __name__ == "__main__":
+    unittest.main()